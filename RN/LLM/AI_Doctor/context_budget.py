@@ -0,0 +1,82 @@
+# context_budget.py
+#
+# Keeps the summarize_sources prompt inside the model's context window.
+# Ollama silently drops the start of a prompt longer than num_ctx, so the
+# prompt is sized before it is sent: the running summary is compacted once
+# it passes a threshold and the new sources get whatever room is left.
+#
+# Token counts are estimated from character counts with a chars-per-token
+# ratio that is calibrated against the prompt_eval_count Ollama reports for
+# every call, so the estimate converges on the real llama tokenizer without
+# shipping it.
+
+import os
+import threading
+
+DIAGNOSIS_NUM_CTX = int(os.environ.get("DIAGNOSIS_NUM_CTX", "4096"))
+# Room left for the model's answer
+DIAGNOSIS_COMPLETION_RESERVE = int(os.environ.get("DIAGNOSIS_COMPLETION_RESERVE", "1024"))
+# Compact the running summary once it is longer than this many tokens
+DIAGNOSIS_SUMMARY_COMPACT_TOKENS = int(os.environ.get("DIAGNOSIS_SUMMARY_COMPACT_TOKENS", "1200"))
+
+TRUNCATION_MARK = "... [truncated]"
+
+
+class TokenCounter:
+    """Character-based token estimate, calibrated from observed usage."""
+
+    def __init__(self, chars_per_token=4.0, smoothing=0.2):
+        # 4 chars/token is the usual English estimate; calibration takes over after the first call
+        self.chars_per_token = chars_per_token
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+
+    def count(self, text):
+        if not text:
+            return 0
+        return int(len(text) / self.chars_per_token) + 1
+
+    def calibrate(self, chars, tokens):
+        """Fold an observed (prompt characters, prompt tokens) pair into the ratio."""
+        if chars <= 0 or tokens <= 0:
+            return
+        with self._lock:
+            observed = chars / tokens
+            self.chars_per_token += self.smoothing * (observed - self.chars_per_token)
+
+    def truncate(self, text, max_tokens):
+        """Cut `text` to about `max_tokens`, at a word boundary where possible."""
+        if text is None or self.count(text) <= max_tokens:
+            return text
+        limit = max(0, int(max_tokens * self.chars_per_token) - len(TRUNCATION_MARK))
+        cut = text.rfind(" ", 0, limit)
+        return text[:cut if cut > limit // 2 else limit] + TRUNCATION_MARK
+
+
+class ContextBudget:
+    """Token budget for one prompt: num_ctx minus the completion reserve."""
+
+    def __init__(self, num_ctx=DIAGNOSIS_NUM_CTX, completion_reserve=DIAGNOSIS_COMPLETION_RESERVE,
+                 compact_threshold=DIAGNOSIS_SUMMARY_COMPACT_TOKENS, counter=None):
+        self.num_ctx = num_ctx
+        self.max_prompt_tokens = num_ctx - completion_reserve
+        self.compact_threshold = compact_threshold
+        self.counter = counter or TokenCounter()
+
+    def count(self, text):
+        return self.counter.count(text)
+
+    def needs_compaction(self, summary):
+        return self.count(summary) > self.compact_threshold
+
+    def remaining(self, *parts):
+        """Tokens left for the rest of the prompt after `parts`."""
+        return max(0, self.max_prompt_tokens - sum(self.count(part) for part in parts))
+
+    def fit(self, text, max_tokens):
+        return self.counter.truncate(text, max_tokens)
+
+    def calibrate(self, messages, result):
+        """Calibrate from an LLM call's messages and the prompt tokens Ollama reported."""
+        usage = getattr(result, "usage_metadata", None) or {}
+        self.counter.calibrate(sum(len(m.content) for m in messages), usage.get("input_tokens", 0))
@@ -0,0 +1,685 @@
+# diagnosis_engine.py
+#
+# The research graph behind the AI doctor (generate_query -> web_research ->
+# summarize_sources -> reflect_on_summary -> ... -> finalize_summary).
+# The loop ends as soon as a node records a stop reason: no knowledge gap
+# left, only already-read sources, a repeated query, max loops, or the
+# per-diagnosis time/token budget.
+# The LLM clients and the compiled StateGraph are created once per process
+# by get_engine() and reused for every diagnosis.
+
+import asyncio
+import hashlib
+import json
+import operator
+import os
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_ollama import ChatOllama
+from langgraph.graph import START, END, StateGraph
+from langsmith import traceable
+from typing_extensions import Annotated, TypedDict
+
+from LLM.AI_Doctor.context_budget import DIAGNOSIS_NUM_CTX, ContextBudget
+from LLM.AI_Doctor.graph_metrics import (observed_invoke, observed_search, record_cache_lookup,
+                                         record_research_stop, timed_node, token_usage)
+from LLM.AI_Doctor.ollama_ping import OLLAMA_KEEP_ALIVE, OLLAMA_MODEL
+from LLM.AI_Doctor.result_cache import DiagnosisResultCache
+from LLM.AI_Doctor.search_providers import get_search_provider
+
+'''
+### LLM
+#For server
+server_url = "http://172.17.9.74:11434"
+llm = ChatOllama(model="llama3.3",base_url=server_url,temperature=0.7)
+llm_json_mode = ChatOllama(model="llama3.3",base_url=server_url,temperature=0, format="json")
+'''
+#For local
+LOCAL_LLM = OLLAMA_MODEL
+
+# --- Prompts ---
+HEAD_BASE_PROMPT = "A patient has shown up with the below skin condition:"
+TAIL_BASE_PROMPT = "Your job is to recommend a medicine for the patient. Also explain the reasoning behind your recommendation.If Recomendation is not possible then dont recommend any medicine. Just recommend a specialist doctor to consult."
+
+query_writer_instructions = """Your goal is to generate targeted web search query.
+
+The query will gather information related to a specific topic.
+
+Topic:
+{research_topic}
+
+Return your query as a JSON object:
+{{
+    "query": "string",
+    "aspect": "string",
+    "rationale": "string"
+}}
+"""
+
+multi_query_writer_instructions = """Your goal is to generate {count} diverse, targeted web search queries.
+
+Each query should cover a different aspect of the topic (for example the condition itself, treatment
+and medication, warning signs, when to see a specialist) so that together they gather complementary
+information.
+
+Topic:
+{research_topic}
+
+Return your queries as a JSON object:
+{{
+    "queries": [
+        {{"query": "string", "aspect": "string"}}
+    ]
+}}
+"""
+
+summarizer_instructions = """Your goal is to generate a high-quality summary of the web search results.
+
+When EXTENDING an existing summary:
+1. Seamlessly integrate new information without repeating what's already covered
+2. Maintain consistency with the existing content's style and depth
+3. Only add new, non-redundant information
+4. Ensure smooth transitions between existing and new content
+
+When creating a NEW summary:
+1. Highlight the most relevant information from each source
+2. Provide a concise overview of the key points related to the report topic
+3. Emphasize significant findings or insights
+4. Ensure a coherent flow of information
+
+In both cases:
+- Focus on factual, objective information
+- Maintain a consistent technical depth
+- Avoid redundancy and repetition
+- DO NOT use phrases like "based on the new results" or "according to additional sources"
+- DO NOT add a preamble like "Here is an extended summary ..." Just directly output the summary.
+- DO NOT add a References or Works Cited section.
+"""
+
+compaction_instructions = """Condense the summary below to at most {max_words} words.
+
+Keep every distinct fact, recommendation and caveat; drop repetition, filler and transitions.
+Output only the condensed summary, with no preamble."""
+
+reflection_instructions = """You are an expert research assistant analyzing a summary about {research_topic}.
+
+Your tasks:
+1. Identify knowledge gaps or areas that need deeper exploration
+2. Generate a follow-up question that would help expand your understanding
+3. Focus on technical details, implementation specifics, or emerging trends that weren't fully covered
+
+Ensure the follow-up question is self-contained and includes necessary context for web search.
+
+If the summary already covers the topic well enough to make a recommendation, return an empty
+string for both fields instead of inventing a gap.
+
+Return your analysis as a JSON object:
+{{
+    "knowledge_gap": "string",
+    "follow_up_query": "string"
+}}"""
+
+
+def build_prompt(skin_condition):
+    return HEAD_BASE_PROMPT + skin_condition + TAIL_BASE_PROMPT
+
+def prompt_template_hash():
+    """Hash of every prompt template; part of the result cache key."""
+    templates = [HEAD_BASE_PROMPT, TAIL_BASE_PROMPT, query_writer_instructions, multi_query_writer_instructions,
+                 summarizer_instructions, compaction_instructions, reflection_instructions]
+    return hashlib.sha256("\x00".join(templates).encode("utf-8")).hexdigest()
+
+
+# --- Graph state ---
+@dataclass(kw_only=True)
+class SummaryState:
+    research_topic: str = field(default=None) # Report topic
+    search_query: str = field(default=None) # Search query
+    web_research_results: Annotated[list, operator.add] = field(default_factory=list)
+    sources_gathered: Annotated[list, operator.add] = field(default_factory=list)
+    research_loop_count: int = field(default=0) # Research loop count
+    running_summary: str = field(default=None) # Final report
+    # Adaptive loop control
+    search_queries: Annotated[list, operator.add] = field(default_factory=list) # Every query searched so far
+    pending_queries: list = field(default_factory=list) # Parallel mode: queries for the next web_research
+    seen_urls: Annotated[list, operator.add] = field(default_factory=list) # URLs of every source gathered
+    started_at: float = field(default=None) # time.monotonic() when the run began
+    llm_calls: int = field(default=0)
+    tokens_used: int = field(default=0) # Prompt + completion tokens so far
+    stop_reason: str = field(default=None) # Set once the research should stop (see STOP_* below)
+
+class SummaryStateInput(TypedDict):
+    research_topic: str # Report topic
+
+class SummaryStateOutput(TypedDict):
+    running_summary: str # Final report
+    stop_reason: str
+    research_loop_count: int
+    llm_calls: int
+
+@dataclass(kw_only=True)
+class Configuration:
+    """The configurable fields for the research assistant."""
+    max_web_research_loops: int = 3
+    local_llm: str = "llama3.2"
+    # Per-diagnosis budgets; the research stops early once either is spent
+    max_research_seconds: float = 300
+    max_llm_tokens: int = 24000
+    # "serial": one query per loop. "parallel": the first loop searches
+    # parallel_queries queries at once, at most search_concurrency in flight
+    research_mode: str = "serial"
+    parallel_queries: int = 3
+    search_concurrency: int = 3
+
+    @classmethod
+    def from_runnable_config(
+        cls, config: Optional[RunnableConfig] = None
+    ) -> "Configuration":
+        """Create a Configuration instance from a RunnableConfig."""
+        configurable = (
+            config["configurable"] if config and "configurable" in config else {}
+        )
+        values: dict[str, Any] = {
+            f.name: os.environ.get(f.name.upper(), configurable.get(f.name))
+            for f in fields(cls)
+            if f.init
+        }
+        return cls(**{k: v for k, v in values.items() if v})
+
+
+# Why the research loop stopped, recorded on the final state and in /metrics
+STOP_NO_GAP = "no_knowledge_gap"
+STOP_REPEATED_SOURCES = "repeated_sources"
+STOP_REPEATED_QUERY = "repeated_query"
+STOP_MAX_LOOPS = "max_loops"
+STOP_TIME_BUDGET = "time_budget"
+STOP_TOKEN_BUDGET = "token_budget"
+
+# Chat template and message framing around the summarize_sources prompt parts
+PROMPT_OVERHEAD_TOKENS = 64
+
+def normalize_query(query):
+    return " ".join((query or "").lower().split())
+
+
+# --- Parallel search ---
+def parallel_search(search, queries, concurrency=3, **kwargs):
+    """Run `search(query, **kwargs)` for every query at once, at most `concurrency` in flight.
+
+    Providers are blocking, so each call runs in a worker thread under an
+    asyncio semaphore. Returns the responses in query order; a failed search
+    contributes an empty response instead of failing the whole round.
+    """
+    async def run_all():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(query):
+            async with semaphore:
+                try:
+                    return await asyncio.to_thread(search, query, **kwargs)
+                except Exception as e:
+                    print(f"Search failed for {query!r}: {e}")
+                    return {"results": []}
+
+        return await asyncio.gather(*(run(query) for query in queries))
+
+    return asyncio.run(run_all())
+
+def merge_search_responses(responses, seen_urls=()):
+    """Combine search responses into one, dropping repeats by URL and by content.
+
+    Mirrors of the same page under different URLs are caught by hashing the
+    normalized content. URLs in `seen_urls` (read in earlier loops) are dropped too.
+    """
+    seen_urls = set(seen_urls)
+    seen_hashes = set()
+    results = []
+    for response in responses:
+        for result in response.get('results', []):
+            text = result.get('raw_content') or result.get('content') or ""
+            content_hash = hashlib.sha256(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+            if result['url'] in seen_urls or (text and content_hash in seen_hashes):
+                continue
+            seen_urls.add(result['url'])
+            seen_hashes.add(content_hash)
+            results.append(result)
+    return {"results": results}
+
+
+# --- Source formatting ---
+def deduplicate_and_format_sources(search_response, max_tokens_per_source, include_raw_content=True, chars_per_token=4):
+    """
+    Takes either a single search response or list of responses from Tavily API and formats them.
+    Limits the raw_content to approximately max_tokens_per_source.
+    include_raw_content specifies whether to include the raw_content from Tavily in the formatted string.
+
+    Args:
+        search_response: Either:
+            - A dict with a 'results' key containing a list of search results
+            - A list of dicts, each containing search results
+        chars_per_token: Characters per token used to turn the token limit into a character limit
+
+    Returns:
+        str: Formatted string with deduplicated sources
+    """
+    # Convert input to list of results
+    if isinstance(search_response, dict):
+        sources_list = search_response['results']
+    elif isinstance(search_response, list):
+        sources_list = []
+        for response in search_response:
+            if isinstance(response, dict) and 'results' in response:
+                sources_list.extend(response['results'])
+            else:
+                sources_list.extend(response)
+    else:
+        raise ValueError("Input must be either a dict with 'results' or a list of search results")
+
+    # Deduplicate by URL
+    unique_sources = {}
+    for source in sources_list:
+        if source['url'] not in unique_sources:
+            unique_sources[source['url']] = source
+
+    # Format output: collect the pieces and join once instead of growing a string
+    char_limit = int(max_tokens_per_source * chars_per_token)
+    parts = ["Sources:\n\n"]
+    for source in unique_sources.values():
+        parts.append(f"Source {source['title']}:\n===\n")
+        parts.append(f"URL: {source['url']}\n===\n")
+        parts.append(f"Most relevant content from source: {source['content']}\n===\n")
+        if include_raw_content:
+            # Handle None raw_content
+            raw_content = source.get('raw_content', '')
+            if raw_content is None:
+                raw_content = ''
+                print(f"Warning: No raw_content found for source {source['url']}")
+            if len(raw_content) > char_limit:
+                raw_content = raw_content[:char_limit] + "... [truncated]"
+            parts.append(f"Full source content limited to {max_tokens_per_source} tokens: {raw_content}\n\n")
+
+    return "".join(parts).strip()
+
+def format_sources(search_results):
+    """Format search results into a bullet-point list of sources.
+
+    Args:
+        search_results (dict): Tavily search response containing results
+
+    Returns:
+        str: Formatted string with sources and their URLs
+    """
+    return '\n'.join(
+        f"* {source['title']} : {source['url']}"
+        for source in search_results['results']
+    )
+
+
+# --- Progress events ---
+GRAPH_NODES = ("generate_query", "web_research", "summarize_sources", "reflect_on_summary", "finalize_summary")
+
+class ProgressCallbackHandler(BaseCallbackHandler):
+    """Forwards node transitions and LLM tokens of one graph run to `emit(event)`.
+
+    Events are plain dicts:
+        {"type": "node", "node": "web_research", "state": "start" | "end"}
+        {"type": "token", "node": "summarize_sources", "text": "..."}
+    ChatOllama streams from Ollama even for invoke(), so tokens arrive as
+    they are generated rather than when the call returns.
+    """
+
+    def __init__(self, emit):
+        self.emit = emit
+        self._nodes = {}  # chain run_id -> node name
+        self._llm_nodes = {}  # chat model run_id -> node it runs in
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        if name in GRAPH_NODES and (metadata or {}).get("langgraph_node") == name:
+            self._nodes[run_id] = name
+            self.emit({"type": "node", "node": name, "state": "start"})
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        name = self._nodes.pop(run_id, None)
+        if name is not None:
+            self.emit({"type": "node", "node": name, "state": "end"})
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._nodes.pop(run_id, None)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._llm_nodes[run_id] = (metadata or {}).get("langgraph_node")
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if token:
+            self.emit({"type": "token", "node": self._llm_nodes.get(run_id), "text": token})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._llm_nodes.pop(run_id, None)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._llm_nodes.pop(run_id, None)
+
+
+def with_progress(config: Optional[RunnableConfig], on_event) -> Optional[RunnableConfig]:
+    """Return `config` with a ProgressCallbackHandler for `on_event` added."""
+    if on_event is None:
+        return config
+    config = dict(config or {})
+    config["callbacks"] = [*(config.get("callbacks") or []), ProgressCallbackHandler(on_event)]
+    return config
+
+
+class DiagnosisEngine:
+    """Holds the LLM clients and the compiled research graph.
+
+    Build it once (see get_engine) and call diagnose()/adiagnose() per request;
+    the graph is stateless between invocations.
+    """
+
+    def __init__(self, model=LOCAL_LLM, keep_alive=OLLAMA_KEEP_ALIVE, result_cache=None, search_provider=None):
+        self.model = model
+        self.result_cache = result_cache
+        self.prompt_hash = prompt_template_hash()
+        # keep_alive is sent with every call so Ollama never unloads the model mid-run
+        # num_ctx is set explicitly so the context budget below matches what Ollama allocates
+        self.llm = ChatOllama(model=model, temperature=0, keep_alive=keep_alive, num_ctx=DIAGNOSIS_NUM_CTX)
+        self.llm_json_mode = ChatOllama(model=model, temperature=0, format="json", keep_alive=keep_alive,
+                                        num_ctx=DIAGNOSIS_NUM_CTX)
+        self.context_budget = ContextBudget(num_ctx=DIAGNOSIS_NUM_CTX)
+        self.search_provider = search_provider or get_search_provider()
+        self.graph = self._build_graph()
+
+    def diagnose(self, skin_condition, config: Optional[RunnableConfig] = None, on_event=None, use_cache=True):
+        """Run the research graph; `on_event` receives progress events (see ProgressCallbackHandler).
+
+        Pass `use_cache=False` after checking `cached_diagnosis()` yourself, so
+        the miss is not looked up (and counted) twice; the result is still stored.
+        """
+        cached = self.cached_diagnosis(skin_condition, config) if use_cache else None
+        if cached is not None:
+            return cached
+        research_input = SummaryStateInput(research_topic=build_prompt(skin_condition))
+        summary = self.graph.invoke(research_input, with_progress(config, on_event))
+        self._store(skin_condition, config, summary['running_summary'])
+        return summary['running_summary']
+
+    async def adiagnose(self, skin_condition, config: Optional[RunnableConfig] = None, on_event=None,
+                        use_cache=True):
+        cached = self.cached_diagnosis(skin_condition, config) if use_cache else None
+        if cached is not None:
+            return cached
+        research_input = SummaryStateInput(research_topic=build_prompt(skin_condition))
+        summary = await self.graph.ainvoke(research_input, with_progress(config, on_event))
+        self._store(skin_condition, config, summary['running_summary'])
+        return summary['running_summary']
+
+    def cached_diagnosis(self, skin_condition, config: Optional[RunnableConfig] = None):
+        """Return a previously computed summary for this condition, or None."""
+        if self.result_cache is None:
+            return None
+        cached = self.result_cache.get(*self._cache_key(skin_condition, config))
+        record_cache_lookup("diagnosis", cached is not None)
+        return cached
+
+    def _store(self, skin_condition, config, running_summary):
+        if self.result_cache is not None:
+            self.result_cache.put(*self._cache_key(skin_condition, config), running_summary)
+
+    def _cache_key(self, skin_condition, config):
+        configurable = Configuration.from_runnable_config(config)
+        loops = int(configurable.max_web_research_loops)
+        # Offline and web research give different summaries, so the provider is part of the model key
+        model_key = f"{self.model}@{self.search_provider.name}"
+        if configurable.research_mode == "parallel":
+            model_key += f"/parallel{int(configurable.parallel_queries)}"
+        return skin_condition, self.prompt_hash, model_key, loops
+
+    @traceable
+    def search(self, query, include_raw_content=True, max_results=3):
+        """ Search for sources using the configured provider (Tavily or the offline knowledge base).
+
+        Args:
+            query (str): The search query to execute
+            include_raw_content (bool): Whether to include the raw_content in the formatted string
+            max_results (int): Maximum number of results to return
+
+        Returns:
+            dict: Search response containing:
+                - results (list): List of search result dictionaries, each containing:
+                    - title (str): Title of the search result
+                    - url (str): URL of the search result
+                    - content (str): Snippet/summary of the content
+                    - raw_content (str): Full content of the page if available"""
+
+        with observed_search(self.search_provider.name) as call:
+            call["response"] = self.search_provider.search(query,
+                                max_results=max_results,
+                                include_raw_content=include_raw_content)
+        return call["response"]
+
+    # --- Graph nodes ---
+    def generate_query(self, state: SummaryState, config: RunnableConfig):
+        """ Generate a query for web search """
+
+        configurable = Configuration.from_runnable_config(config)
+        if configurable.research_mode == "parallel":
+            return self._generate_queries(state, int(configurable.parallel_queries))
+
+        # Format the prompt
+        query_writer_instructions_formatted = query_writer_instructions.format(research_topic=state.research_topic)
+
+        # Generate a query
+        result = self._invoke(self.llm_json_mode, "generate_query", "json",
+            [SystemMessage(content=query_writer_instructions_formatted),
+            HumanMessage(content=f"Generate a query for web search:")]
+        )
+        query = json.loads(result.content)
+
+        return {"search_query": query['query'], "search_queries": [normalize_query(query['query'])],
+                "started_at": time.monotonic(), "llm_calls": 1, "tokens_used": token_usage(result)}
+
+    def _generate_queries(self, state: SummaryState, count):
+        """ Generate several diverse queries in one call, for parallel research """
+
+        result = self._invoke(self.llm_json_mode, "generate_query", "json",
+            [SystemMessage(content=multi_query_writer_instructions.format(count=count, research_topic=state.research_topic)),
+            HumanMessage(content=f"Generate {count} queries for web search:")]
+        )
+        queries = []
+        for item in json.loads(result.content).get('queries', []):
+            query = (item.get('query') if isinstance(item, dict) else item) or ""
+            if query.strip() and normalize_query(query) not in map(normalize_query, queries):
+                queries.append(query.strip())
+        if not queries:
+            raise ValueError(f"No search queries in model output: {result.content[:200]}")
+        queries = queries[:count]
+
+        return {"search_query": queries[0], "pending_queries": queries,
+                "search_queries": [normalize_query(q) for q in queries],
+                "started_at": time.monotonic(), "llm_calls": 1, "tokens_used": token_usage(result)}
+
+    def web_research(self, state: SummaryState, config: RunnableConfig):
+        """ Gather information from the web (or the offline knowledge base) """
+
+        # Search the web: every pending query at once in parallel mode, otherwise the current one
+        queries = state.pending_queries or [state.search_query]
+        if len(queries) > 1:
+            concurrency = int(Configuration.from_runnable_config(config).search_concurrency)
+            responses = parallel_search(self.search, queries, concurrency=concurrency,
+                                        include_raw_content=True, max_results=1)
+        else:
+            responses = [self.search(queries[0], include_raw_content=True, max_results=1)]
+        update = {"research_loop_count": state.research_loop_count + 1, "pending_queries": []}
+
+        # Only sources we have not read already, deduplicated across all queries
+        search_results = merge_search_responses(responses, seen_urls=state.seen_urls)
+        new_urls = [r['url'] for r in search_results['results']]
+        # Nothing new: another summarize pass would only restate it
+        if state.research_loop_count and not new_urls:
+            update["stop_reason"] = STOP_REPEATED_SOURCES
+            return update
+
+        # Format the sources
+        search_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=1000,
+                                                    chars_per_token=self.context_budget.counter.chars_per_token)
+        update.update({"sources_gathered": [format_sources(search_results)], "web_research_results": [search_str],
+                       "seen_urls": new_urls})
+        return update
+
+    def summarize_sources(self, state: SummaryState, config: RunnableConfig):
+        """ Summarize the gathered sources """
+
+        budget = self.context_budget
+        llm_calls, tokens_used = state.llm_calls, state.tokens_used
+
+        # Existing summary, compacted first if it has grown past the threshold
+        existing_summary = state.running_summary
+        if existing_summary and budget.needs_compaction(existing_summary):
+            existing_summary, compact_tokens = self._compact_summary(existing_summary)
+            llm_calls, tokens_used = llm_calls + 1, tokens_used + compact_tokens
+
+        # Most recent web research, cut to whatever room the rest of the prompt leaves
+        room = budget.remaining(summarizer_instructions, existing_summary, state.research_topic) - PROMPT_OVERHEAD_TOKENS
+        most_recent_web_research = budget.fit(state.web_research_results[-1], room)
+
+        # Build the human message
+        if existing_summary:
+            human_message_content = (
+                f"Extend the existing summary: {existing_summary}\n\n"
+                f"Include new search results: {most_recent_web_research} "
+                f"That addresses the following topic: {state.research_topic}"
+            )
+        else:
+            human_message_content = (
+                f"Generate a summary of these search results: {most_recent_web_research} "
+                f"That addresses the following topic: {state.research_topic}"
+            )
+
+        # Run the LLM
+        result = self._invoke(self.llm, "summarize_sources", "text",
+            [SystemMessage(content=summarizer_instructions),
+            HumanMessage(content=human_message_content)]
+        )
+
+        running_summary = result.content
+        update = {"running_summary": running_summary, "llm_calls": llm_calls + 1,
+                  "tokens_used": tokens_used + token_usage(result)}
+
+        # Stop here rather than after another reflection whose query would never be searched
+        configurable = Configuration.from_runnable_config(config)
+        if state.research_loop_count >= int(configurable.max_web_research_loops):
+            update["stop_reason"] = STOP_MAX_LOOPS
+        else:
+            update["stop_reason"] = self._budget_spent(state.started_at, update["tokens_used"], configurable)
+        return update
+
+    def _compact_summary(self, summary):
+        """Condense `summary` to about half the compaction threshold; returns (summary, tokens used)."""
+        max_words = self.context_budget.compact_threshold // 2
+        messages = [SystemMessage(content=compaction_instructions.format(max_words=max_words)),
+                    HumanMessage(content=summary)]
+        result = self._invoke(self.llm, "summarize_sources", "compact", messages)
+        return result.content, token_usage(result)
+
+    def reflect_on_summary(self, state: SummaryState, config: RunnableConfig):
+        """ Reflect on the summary and generate a follow-up query """
+
+        # Generate a query
+        result = self._invoke(self.llm_json_mode, "reflect_on_summary", "json",
+            [SystemMessage(content=reflection_instructions.format(research_topic=state.research_topic)),
+            HumanMessage(content=f"Identify a knowledge gap and generate a follow-up web search query based on our existing knowledge: {state.running_summary}")]
+        )
+        follow_up_query = json.loads(result.content)
+        query = (follow_up_query.get('follow_up_query') or "").strip()
+        update = {"llm_calls": state.llm_calls + 1, "tokens_used": state.tokens_used + token_usage(result)}
+
+        if not query or not (follow_up_query.get('knowledge_gap') or "").strip():
+            update["stop_reason"] = STOP_NO_GAP
+        elif normalize_query(query) in state.search_queries:
+            update["stop_reason"] = STOP_REPEATED_QUERY
+        else:
+            configurable = Configuration.from_runnable_config(config)
+            update["stop_reason"] = self._budget_spent(state.started_at, update["tokens_used"], configurable)
+
+        # Overwrite the search query
+        update.update({"search_query": query, "search_queries": [normalize_query(query)]})
+        return update
+
+    def finalize_summary(self, state: SummaryState):
+        """ Finalize the summary """
+
+        record_research_stop(state.stop_reason, state.research_loop_count, state.llm_calls)
+        print(f"Research stopped after {state.research_loop_count} loop(s) and {state.llm_calls} LLM call(s): {state.stop_reason}")
+
+        # Format all accumulated sources into a single bulleted list
+        all_sources = "\n".join(source for source in state.sources_gathered)
+        running_summary = f"## Summary\n\n{state.running_summary}\n\n ### Sources:\n{all_sources}"
+        return {"running_summary": running_summary}
+
+    def _invoke(self, llm, node, mode, messages):
+        """Instrumented LLM call that also calibrates the context budget's token estimate."""
+        result = observed_invoke(llm, node, mode, messages)
+        self.context_budget.calibrate(messages, result)
+        return result
+
+    @staticmethod
+    def _budget_spent(started_at, tokens_used, configurable):
+        if started_at is not None and time.monotonic() - started_at >= float(configurable.max_research_seconds):
+            return STOP_TIME_BUDGET
+        if tokens_used >= int(configurable.max_llm_tokens):
+            return STOP_TOKEN_BUDGET
+        return None
+
+    @staticmethod
+    def continue_or_finalize(next_node):
+        """Conditional edge: go on to `next_node` unless a node recorded a stop reason."""
+        def route(state: SummaryState):
+            return "finalize_summary" if state.stop_reason else next_node
+        return route
+
+    def _build_graph(self):
+        # Add nodes and edges
+        builder = StateGraph(SummaryState, input=SummaryStateInput, output=SummaryStateOutput, config_schema=Configuration)
+        # Every node is timed for /metrics
+        for name in GRAPH_NODES:
+            builder.add_node(name, timed_node(name, getattr(self, name)))
+
+        # Add edges; each step after the first search may end the research early
+        builder.add_edge(START, "generate_query")
+        builder.add_edge("generate_query", "web_research")
+        builder.add_conditional_edges("web_research", self.continue_or_finalize("summarize_sources"),
+                                      ["summarize_sources", "finalize_summary"])
+        builder.add_conditional_edges("summarize_sources", self.continue_or_finalize("reflect_on_summary"),
+                                      ["reflect_on_summary", "finalize_summary"])
+        builder.add_conditional_edges("reflect_on_summary", self.continue_or_finalize("web_research"),
+                                      ["web_research", "finalize_summary"])
+        builder.add_edge("finalize_summary", END)
+
+        return builder.compile()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> DiagnosisEngine:
+    """Return the process-wide DiagnosisEngine, building it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = DiagnosisEngine(result_cache=DiagnosisResultCache())
+    return _engine
+
+
+def diagnose(skin_condition, config: Optional[RunnableConfig] = None, on_event=None):
+    return get_engine().diagnose(skin_condition, config, on_event=on_event)
+
+async def adiagnose(skin_condition, config: Optional[RunnableConfig] = None, on_event=None):
+    return await get_engine().adiagnose(skin_condition, config, on_event=on_event)
@@ -1,93 +1,151 @@
+# doctors.py
+#
+# Bulk, re-runnable import of doctor CSV files into the `doctor` table.
+# Rows are streamed, cleaned and validated one at a time, rejected rows are
+# written to a side file with the reason, and valid rows are upserted in
+# batches (INSERT ... ON DUPLICATE KEY UPDATE on MySQL), so running the same
+# import twice leaves the table unchanged.
+#
+# Run from the RN directory:
+#   python -m LLM.AI_Doctor.doctors <csv file or directory> [...] [--batch-size 1000] [--rejects rejects.csv]
+
+import argparse
 import csv
-from sqlalchemy import create_engine, Column, Integer, String
-from sqlalchemy.orm import sessionmaker, declarative_base
+import os
+import sys
+import time
+
+from sqlalchemy.dialects import mysql, sqlite
 from sqlalchemy.exc import SQLAlchemyError
 
-# --- Database Credentials ---
-DATABASE_USER = "root"
-DATABASE_PASSWORD = "devarajan#8"
-DATABASE_HOST = "localhost"
-DATABASE_PORT = "8808"
-DATABASE_NAME = "myappss"
-
-# Construct the Database URL
-DATABASE_URL = f"mysql+pymysql://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{DATABASE_NAME}"
-
-# --- Create Engine and Session ---
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# --- Define the Base Model ---
-Base = declarative_base()
-
-# --- Doctor Model ---
-class Doctor(Base):
-    __tablename__ = 'doctor'
-    doc_id = Column(Integer, primary_key=True, autoincrement=True)
-    first_name = Column(String(50))
-    last_name = Column(String(50))
-    clinic_name = Column(String(100))
-    city = Column(String(50))
-    specialty = Column(String(50))
-    years_of_experience = Column(Integer)
-
-# Create tables in the database if they do not exist
-Base.metadata.create_all(bind=engine)
+from database import engine
+from models import Doctor
+
+DEFAULT_CSV = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "DocID-FirstName-LastName-ClinicHospitalName-City-Specialty-YearsofExperience.csv",
+)
+BATCH_SIZE = 1000
+TEXT_FIELDS = {
+    # CSV column -> (model column, max length)
+    "FirstName": ("first_name", 50),
+    "LastName": ("last_name", 50),
+    "ClinicHospitalName": ("clinic_name", 100),
+    "City": ("city", 50),
+    "Specialty": ("specialty", 50),
+}
+UPDATE_COLUMNS = [column for column, _ in TEXT_FIELDS.values()] + ["years_of_experience"]
+
 
 # --- Helper Function to Clean and Convert Numeric Fields ---
 def clean_numeric(value):
     """
-    Clean a string by stripping whitespace and removing any backticks,
-    then return an integer if possible.
+    Clean a string by stripping whitespace and removing any backticks
+    (and a trailing '+', as in "10+"), then return an integer if possible.
     """
-    cleaned = value.strip().replace("`", "")
+    cleaned = (value or "").strip().replace("`", "").rstrip("+").strip()
     if cleaned == "":
         raise ValueError("Empty numeric value")
     return int(cleaned)
 
-# --- Function to Insert Doctors from CSV ---
-def insert_doctors_from_csv(csv_file):
-    session = SessionLocal()
+
+def clean_row(row):
+    """Return the doctor column values for a CSV row, or raise ValueError with the reason."""
     try:
-        with open(csv_file, mode='r', newline='', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            row_count = 0
-            skipped = 0
-            for row in reader:
-                row_count += 1
-                try:
-                    # Clean and convert numeric fields.
-                    doc_id_val = clean_numeric(row['DocID'])
-                    years_val = clean_numeric(row['YearsofExperience'])
-                except ValueError as ve:
-                    # Log error and skip this row
-                    print(f"Skipping row {row_count}: Error converting numeric field: {ve} - Row data: {row}")
-                    skipped += 1
-                    continue
-
-                # Create a new Doctor instance using cleaned row data.
-                doctor = Doctor(
-                    doc_id=doc_id_val,
-                    first_name=row['FirstName'].strip(),
-                    last_name=row['LastName'].strip(),
-                    clinic_name=row['ClinicHospitalName'].strip(),
-                    city=row['City'].strip(),
-                    specialty=row['Specialty'].strip(),
-                    years_of_experience=years_val
-                )
-                session.add(doctor)
-            session.commit()
-        print(f"✅ All doctors inserted successfully! Processed: {row_count}, Skipped: {skipped}")
-    except SQLAlchemyError as e:
-        session.rollback()
-        print(f"❌ A database error occurred: {e}")
-    except Exception as ex:
-        session.rollback()
-        print(f"❌ Unexpected error: {ex}")
-    finally:
-        session.close()
+        doctor = {
+            "doc_id": clean_numeric(row.get("DocID")),
+            "years_of_experience": clean_numeric(row.get("YearsofExperience")),
+        }
+    except ValueError as ve:
+        raise ValueError(f"Error converting numeric field: {ve}")
+    if doctor["doc_id"] <= 0:
+        raise ValueError("DocID must be positive")
+    for field, (column, max_length) in TEXT_FIELDS.items():
+        value = (row.get(field) or "").strip()
+        if not value:
+            raise ValueError(f"Missing {field}")
+        if len(value) > max_length:
+            raise ValueError(f"{field} longer than {max_length} characters")
+        doctor[column] = value
+    return doctor
+
+
+def iter_csv_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(".csv"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def upsert_statement(bind):
+    table = Doctor.__table__
+    if bind.dialect.name == "mysql":
+        stmt = mysql.insert(table)
+        return stmt.on_duplicate_key_update({column: stmt.inserted[column] for column in UPDATE_COLUMNS})
+    if bind.dialect.name == "sqlite":
+        stmt = sqlite.insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=["doc_id"], set_={column: stmt.excluded[column] for column in UPDATE_COLUMNS}
+        )
+    raise ValueError(f"Bulk upsert is not supported for {bind.dialect.name}")
+
+
+def import_doctors(paths, bind=engine, batch_size=BATCH_SIZE, rejects_path="rejected_doctors.csv"):
+    stmt = upsert_statement(bind)
+    stats = {"files": 0, "processed": 0, "upserted": 0, "rejected": 0}
+    started = time.perf_counter()
+
+    with open(rejects_path, mode="w", newline="", encoding="utf-8") as rejects_file:
+        rejects = None
+        batch = []
+
+        def flush():
+            if batch:
+                # One transaction and one multi-row statement per batch
+                with bind.begin() as conn:
+                    conn.execute(stmt, batch)
+                stats["upserted"] += len(batch)
+                batch.clear()
+
+        for csv_file in iter_csv_files(paths):
+            stats["files"] += 1
+            with open(csv_file, mode="r", newline="", encoding="utf-8") as file:
+                reader = csv.DictReader(file)
+                for line_no, row in enumerate(reader, start=2):
+                    stats["processed"] += 1
+                    try:
+                        batch.append(clean_row(row))
+                    except ValueError as ve:
+                        if rejects is None:
+                            rejects = csv.writer(rejects_file)
+                            rejects.writerow(["file", "line", "reason"] + reader.fieldnames)
+                        rejects.writerow([csv_file, line_no, str(ve)] + [row.get(f, "") for f in reader.fieldnames])
+                        stats["rejected"] += 1
+                        continue
+                    if len(batch) >= batch_size:
+                        flush()
+        flush()
+
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
 
 # --- Main Execution ---
 if __name__ == "__main__":
-    CSV_FILE = r"C:\Users\rdeva\Downloads\SEM3\SEM4\RN\LLM\AI_Doctor\DocID-FirstName-LastName-ClinicHospitalName-City-Specialty-YearsofExperience.csv"
-    insert_doctors_from_csv(CSV_FILE)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="*", default=[DEFAULT_CSV], help="CSV files or directories of CSV files")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--rejects", default="rejected_doctors.csv", help="Where to write rejected rows")
+    args = parser.parse_args()
+
+    try:
+        stats = import_doctors(args.paths, batch_size=args.batch_size, rejects_path=args.rejects)
+    except SQLAlchemyError as e:
+        print(f"❌ A database error occurred: {e}")
+        sys.exit(1)
+    print(f"✅ Imported {stats['upserted']} doctors from {stats['files']} file(s) in {stats['seconds']:.2f}s. "
+          f"Processed: {stats['processed']}, Rejected: {stats['rejected']} (see {args.rejects})")
@@ -0,0 +1,129 @@
+# graph_metrics.py
+#
+# Prometheus metrics for the research graph: wall time per node, per LLM
+# call and per search, token counts and payload sizes of every LLM call,
+# why and after how many loops each research run stopped, and cache
+# lookups. Everything is recorded in-process on the default registry
+# (served by the API's /metrics), so it works offline and does not need
+# LangSmith.
+
+import inspect
+import time
+from contextlib import contextmanager
+
+from langchain_core.runnables import RunnableConfig
+from prometheus_client import Counter, Histogram
+
+# LLM calls and searches range from ~100 ms (warm, cached) to minutes (cold model)
+SECONDS_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+NODE_SECONDS = Histogram(
+    "diagnosis_node_seconds", "Wall time of one research graph node run",
+    ["node"], buckets=SECONDS_BUCKETS)
+NODE_ERRORS = Counter(
+    "diagnosis_node_errors_total", "Research graph node runs that raised",
+    ["node"])
+
+LLM_SECONDS = Histogram(
+    "diagnosis_llm_call_seconds", "Wall time of one ChatOllama call",
+    ["node", "mode"], buckets=SECONDS_BUCKETS)
+LLM_TOKENS = Counter(
+    "diagnosis_llm_tokens_total", "Tokens reported by Ollama, by prompt/completion",
+    ["node", "mode", "kind"])
+LLM_PROMPT_TOKENS = Histogram(
+    "diagnosis_llm_prompt_tokens", "Prompt size of one LLM call in tokens, as reported by Ollama",
+    ["node", "mode"], buckets=(128, 256, 512, 1024, 2048, 3072, 4096, 8192))
+LLM_PAYLOAD_BYTES = Histogram(
+    "diagnosis_llm_payload_bytes", "UTF-8 size of LLM request messages and responses",
+    ["node", "mode", "direction"], buckets=BYTES_BUCKETS)
+
+SEARCH_SECONDS = Histogram(
+    "diagnosis_search_seconds", "Wall time of one search provider call",
+    ["provider"], buckets=SECONDS_BUCKETS)
+SEARCH_RESULTS = Histogram(
+    "diagnosis_search_results", "Results returned by one search call",
+    ["provider"], buckets=(0, 1, 2, 3, 5, 10))
+SEARCH_PAYLOAD_BYTES = Histogram(
+    "diagnosis_search_payload_bytes", "UTF-8 size of the content returned by one search call",
+    ["provider"], buckets=BYTES_BUCKETS)
+
+RESEARCH_STOPS = Counter(
+    "diagnosis_research_stops_total", "Finished research runs by the reason the loop stopped",
+    ["reason"])
+RESEARCH_LOOPS = Histogram(
+    "diagnosis_research_loops", "web_research passes per diagnosis",
+    buckets=(1, 2, 3, 4, 5, 8))
+RESEARCH_LLM_CALLS = Histogram(
+    "diagnosis_research_llm_calls", "LLM calls per diagnosis",
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15))
+
+CACHE_LOOKUPS = Counter(
+    "diagnosis_cache_lookups_total", "Cache lookups by cache and outcome",
+    ["cache", "result"])
+
+
+def utf8_size(text):
+    return len(text.encode("utf-8")) if text else 0
+
+
+def timed_node(name, fn):
+    """Wrap a graph node so every run is timed (and counted if it raises)."""
+    wants_config = "config" in inspect.signature(fn).parameters
+
+    def node(state, config: RunnableConfig):
+        started = time.perf_counter()
+        try:
+            return fn(state, config) if wants_config else fn(state)
+        except Exception:
+            NODE_ERRORS.labels(name).inc()
+            raise
+        finally:
+            NODE_SECONDS.labels(name).observe(time.perf_counter() - started)
+    node.__name__ = name
+    return node
+
+
+def observed_invoke(llm, node, mode, messages):
+    """`llm.invoke(messages)`, recording time, token counts and payload sizes."""
+    LLM_PAYLOAD_BYTES.labels(node, mode, "request").observe(sum(utf8_size(m.content) for m in messages))
+    started = time.perf_counter()
+    result = llm.invoke(messages)
+    LLM_SECONDS.labels(node, mode).observe(time.perf_counter() - started)
+    LLM_PAYLOAD_BYTES.labels(node, mode, "response").observe(utf8_size(result.content))
+    # ChatOllama fills usage_metadata from Ollama's prompt_eval_count / eval_count
+    usage = getattr(result, "usage_metadata", None) or {}
+    LLM_TOKENS.labels(node, mode, "prompt").inc(usage.get("input_tokens", 0))
+    if usage.get("input_tokens"):
+        LLM_PROMPT_TOKENS.labels(node, mode).observe(usage["input_tokens"])
+    LLM_TOKENS.labels(node, mode, "completion").inc(usage.get("output_tokens", 0))
+    return result
+
+
+def token_usage(result):
+    """Prompt + completion tokens of an LLM result, 0 if the model did not report them."""
+    usage = getattr(result, "usage_metadata", None) or {}
+    return usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+
+
+@contextmanager
+def observed_search(provider):
+    """Time a search call; the caller stores the response on the yielded dict."""
+    call = {"response": None}
+    started = time.perf_counter()
+    yield call
+    SEARCH_SECONDS.labels(provider).observe(time.perf_counter() - started)
+    results = (call["response"] or {}).get("results", [])
+    SEARCH_RESULTS.labels(provider).observe(len(results))
+    SEARCH_PAYLOAD_BYTES.labels(provider).observe(
+        sum(utf8_size(r.get("content")) + utf8_size(r.get("raw_content")) for r in results))
+
+
+def record_research_stop(reason, loops, llm_calls):
+    RESEARCH_STOPS.labels(reason or "unknown").inc()
+    RESEARCH_LOOPS.observe(loops)
+    RESEARCH_LLM_CALLS.observe(llm_calls)
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
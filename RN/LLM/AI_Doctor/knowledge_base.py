@@ -0,0 +1,145 @@
+# knowledge_base.py
+#
+# Offline corpus built from the curated treatment texts in config.ini.
+# The file is parsed once into an in-memory BM25 index so the research graph
+# can answer web_research queries locally instead of going to Tavily.
+
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+KNOWLEDGE_BASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.ini")
+
+# config.ini is not valid INI: every entry is  name= '''<multi-line text>'''
+ENTRY_PATTERN = re.compile(r"^(\w+)\s*=\s*'''(.*?)'''", re.MULTILINE | re.DOTALL)
+URL_PATTERN = re.compile(r"https?://\S+")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "what", "which",
+    "with", "how", "can", "may", "should", "patient", "treatment", "treatments",
+}
+# Plural forms and HAM10000 class codes that appear in diagnosis labels
+ALIASES = {
+    "nevi": "nevus", "naevus": "nevus", "naevi": "nevus", "nv": "nevus",
+    "mel": "melanoma", "melanomas": "melanoma",
+    "bcc": "basal", "bccs": "basal", "carcinomas": "carcinoma",
+    "akiec": "actinic", "aks": "actinic", "keratoses": "keratosis", "bkl": "keratosis", "sks": "keratosis",
+    "df": "dermatofibroma", "dermatofibromas": "dermatofibroma",
+    "vasc": "vascular", "lesions": "lesion",
+}
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+TITLE_BOOST = 3
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        token = ALIASES.get(token, token)
+        if token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+@dataclass(frozen=True)
+class KnowledgeDocument:
+    key: str
+    title: str
+    text: str
+    url: str
+    # Paragraphs without the title and reference lines, used for snippets
+    passages: tuple
+
+
+def parse_knowledge_base(text):
+    documents = []
+    for key, body in ENTRY_PATTERN.findall(text):
+        lines = [line.strip() for line in body.strip().splitlines() if line.strip()]
+        if not lines:
+            continue
+        title = lines[0]
+        urls = URL_PATTERN.findall(body)
+        passages = tuple(line for line in lines[1:] if not URL_PATTERN.search(line))
+        documents.append(KnowledgeDocument(
+            key=key,
+            title=title,
+            text="\n".join(lines[1:]),
+            url=urls[0] if urls else f"kb://{key}",
+            passages=passages,
+        ))
+    return documents
+
+
+class KnowledgeBase:
+    """BM25 index over the config.ini treatment documents."""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self._postings = defaultdict(dict)   # term -> {doc index: term frequency}
+        self._lengths = []
+        for i, doc in enumerate(documents):
+            counts = Counter(tokenize(doc.text))
+            for token in tokenize(doc.title):
+                counts[token] += TITLE_BOOST
+            self._lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings[term][i] = tf
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0
+
+    @classmethod
+    def from_file(cls, path=KNOWLEDGE_BASE_PATH):
+        with open(path, encoding="utf-8") as file:
+            return cls(parse_knowledge_base(file.read()))
+
+    def score(self, query):
+        scores = defaultdict(float)
+        n = len(self.documents)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings.items():
+                norm = K1 * (1 - B + B * self._lengths[i] / self._avg_length)
+                scores[i] += idf * tf * (K1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def best_passage(self, doc, query):
+        terms = set(tokenize(query))
+        if not doc.passages:
+            return doc.text
+        return max(doc.passages, key=lambda passage: len(terms.intersection(tokenize(passage))))
+
+    def search(self, query, include_raw_content=True, max_results=3):
+        """Return results shaped like a Tavily search response."""
+        results = []
+        for i, score in self.score(query)[:max_results]:
+            doc = self.documents[i]
+            results.append({
+                "title": doc.title,
+                "url": doc.url,
+                "content": self.best_passage(doc, query),
+                "raw_content": doc.text if include_raw_content else None,
+                "score": score,
+            })
+        return {"query": query, "results": results}
+
+
+_knowledge_base = None
+_knowledge_base_lock = threading.Lock()
+
+def get_knowledge_base() -> KnowledgeBase:
+    """Return the process-wide knowledge base, parsing config.ini on first use."""
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _knowledge_base_lock:
+            if _knowledge_base is None:
+                _knowledge_base = KnowledgeBase.from_file()
+    return _knowledge_base
@@ -1,5 +1,19 @@
+import json
+import os
 import socket
 import subprocess
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+OLLAMA_HOST = "localhost"
+OLLAMA_PORT = 11434
+OLLAMA_MODEL = "llama3.1:8b"
+# How long Ollama keeps the model in memory after each request
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+# Unload the model after this many seconds without a diagnosis
+OLLAMA_IDLE_TIMEOUT = float(os.environ.get("OLLAMA_IDLE_TIMEOUT", "900"))
 
 def ping_localhost_with_port_and_execute(port, fallback_command):
     host = "localhost"
@@ -7,6 +21,7 @@ def ping_localhost_with_port_and_execute(port, fallback_command):
         # Attempt to connect to the specified port
         with socket.create_connection((host, port), timeout=5) as sock:
             print(f"Successfully connected to {host} on port {port}.")
+        return True
     except (socket.timeout, ConnectionRefusedError):
         print(f"Connection to {host} on port {port} failed. Executing fallback command.")
         # Run the static fallback command in a non-blocking way
@@ -17,11 +32,178 @@ def ping_localhost_with_port_and_execute(port, fallback_command):
             print(f"An error occurred while executing the fallback command: {e}")
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        
-def kill_ollama():
-    subprocess.Popen('ollama stop llama3.1:8b',shell=True)
+    return False
+
+def kill_ollama(model=OLLAMA_MODEL):
+    subprocess.Popen(f'ollama stop {model}',shell=True)
     print("Ollama killed")
 
+
+class OllamaLifecycle:
+    """Keeps the Ollama server up and the diagnosis model warm between requests.
+
+    The server is health-checked once (and again only after a failure), the
+    model is preloaded with a keep-alive window, and a background reaper
+    unloads it once no diagnosis has used it for `idle_timeout` seconds.
+    """
+
+    def __init__(self, model=OLLAMA_MODEL, host=OLLAMA_HOST, port=OLLAMA_PORT,
+                 keep_alive=OLLAMA_KEEP_ALIVE, idle_timeout=OLLAMA_IDLE_TIMEOUT):
+        self.model = model
+        self.host = host
+        self.port = port
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self.base_url = f"http://{host}:{port}"
+
+        # _load_lock serialises load/unload, _lock only guards the counters
+        self._load_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reaper = None
+        self._server_up = False
+        self._warm = False
+        self._active_runs = 0
+        self._last_used = None
+        self._loads = 0
+        self._unloads = 0
+        self._last_load_seconds = None
+        self._total_load_seconds = 0.0
+
+    # --- Public API ---
+    def start(self):
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_idle, name="ollama-reaper", daemon=True)
+            self._reaper.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @contextmanager
+    def in_use(self):
+        """Hold the model warm for the duration of one diagnosis."""
+        with self._lock:
+            self._active_runs += 1
+        try:
+            self.ensure_warm()
+            yield
+        finally:
+            with self._lock:
+                self._active_runs -= 1
+                self._last_used = time.time()
+
+    def ensure_warm(self):
+        with self._load_lock:
+            if self._warm:
+                return
+            self._ensure_server()
+            if self._model_loaded():
+                self._warm = True
+                return
+            started = time.perf_counter()
+            # An empty generate request loads the model and applies keep_alive
+            self._post("/api/generate", {"model": self.model, "keep_alive": self.keep_alive})
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._warm = True
+                self._loads += 1
+                self._last_load_seconds = elapsed
+                self._total_load_seconds += elapsed
+            print(f"Loaded {self.model} in {elapsed:.2f}s")
+
+    def unload(self):
+        with self._load_lock:
+            if not self._warm or self._active_runs:
+                return
+            try:
+                self._post("/api/generate", {"model": self.model, "keep_alive": 0})
+            except OSError:
+                kill_ollama(self.model)
+            with self._lock:
+                self._warm = False
+                self._unloads += 1
+            print(f"Unloaded idle model {self.model}")
+
+    def status(self):
+        with self._lock:
+            idle = time.time() - self._last_used if self._last_used else None
+            return {
+                "model": self.model,
+                "server_up": self._server_up,
+                "state": "warm" if self._warm else "cold",
+                "active_runs": self._active_runs,
+                "idle_seconds": idle,
+                "idle_timeout_seconds": self.idle_timeout,
+                "keep_alive": self.keep_alive,
+                "loads": self._loads,
+                "unloads": self._unloads,
+                "last_load_seconds": self._last_load_seconds,
+                "avg_load_seconds": self._total_load_seconds / self._loads if self._loads else None,
+            }
+
+    # --- Internals ---
+    def _ensure_server(self, wait_seconds=30):
+        if self._server_up:
+            return
+        if not ping_localhost_with_port_and_execute(self.port, 'ollama serve'):
+            deadline = time.time() + wait_seconds
+            while time.time() < deadline:
+                time.sleep(0.5)
+                try:
+                    with socket.create_connection((self.host, self.port), timeout=1):
+                        break
+                except OSError:
+                    continue
+            else:
+                raise RuntimeError(f"Ollama did not come up on port {self.port}")
+        self._server_up = True
+
+    def _model_loaded(self):
+        try:
+            with urllib.request.urlopen(f"{self.base_url}/api/ps", timeout=5) as response:
+                running = json.load(response).get("models", [])
+        except OSError:
+            self._server_up = False
+            return False
+        return any(m.get("name") == self.model or m.get("model") == self.model for m in running)
+
+    def _post(self, path, payload, timeout=300):
+        request = urllib.request.Request(
+            f"{self.base_url}{path}",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.load(response)
+        except OSError:
+            # Force a fresh health check on the next request
+            self._server_up = False
+            self._warm = False
+            raise
+
+    def _reap_idle(self):
+        while not self._stop.wait(min(self.idle_timeout, 30)):
+            with self._lock:
+                idle = (self._warm and self._active_runs == 0 and self._last_used is not None
+                        and time.time() - self._last_used >= self.idle_timeout)
+            if idle:
+                self.unload()
+
+
+_lifecycle = None
+_lifecycle_lock = threading.Lock()
+
+def get_lifecycle() -> OllamaLifecycle:
+    """Return the process-wide OllamaLifecycle."""
+    global _lifecycle
+    if _lifecycle is None:
+        with _lifecycle_lock:
+            if _lifecycle is None:
+                _lifecycle = OllamaLifecycle()
+    return _lifecycle
+
+
 if __name__ == "__main__":
     # Specify the target port and fallback command
     target_port = 11434  # Replace with your desired port
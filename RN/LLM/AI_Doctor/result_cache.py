@@ -0,0 +1,52 @@
+# result_cache.py
+#
+# Persistent cache of finished diagnoses. Both ChatOllama clients run at
+# temperature 0 and the prompt is built from one of a handful of lesion
+# labels, so a summary computed once can be served again until it expires.
+
+import hashlib
+import json
+import os
+
+from LLM.AI_Doctor.sqlite_cache import SqliteCache
+
+DIAGNOSIS_CACHE_PATH = os.environ.get(
+    "DIAGNOSIS_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "diagnosis_cache.sqlite3")
+)
+DIAGNOSIS_CACHE_TTL = float(os.environ.get("DIAGNOSIS_CACHE_TTL", str(7 * 24 * 3600)))
+DIAGNOSIS_CACHE_MAX_ENTRIES = int(os.environ.get("DIAGNOSIS_CACHE_MAX_ENTRIES", "256"))
+
+
+def make_cache_key(label, prompt_hash, model, loops):
+    raw = json.dumps([label, prompt_hash, model, loops])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class DiagnosisResultCache(SqliteCache):
+    """Finished summaries, with a TTL and least-recently-used eviction.
+
+    Entries are keyed on (lesion label, prompt template hash, model name,
+    loop count); changing any of them produces a different key, so stale
+    prompts or models never serve an old summary.
+    """
+
+    table = "diagnosis_cache"
+    columns = (("label", "TEXT"), ("model", "TEXT"), ("prompt_hash", "TEXT"), ("loops", "INTEGER"),
+               ("summary", "TEXT"))
+    value_column = "summary"
+    indexed_columns = ("label",)
+
+    def __init__(self, path=DIAGNOSIS_CACHE_PATH, ttl=DIAGNOSIS_CACHE_TTL, max_entries=DIAGNOSIS_CACHE_MAX_ENTRIES):
+        super().__init__(path, ttl, max_entries)
+
+    def get(self, label, prompt_hash, model, loops):
+        return self._lookup(make_cache_key(label, prompt_hash, model, loops))
+
+    def put(self, label, prompt_hash, model, loops, summary):
+        self._store(make_cache_key(label, prompt_hash, model, loops), label, model, prompt_hash, loops, summary)
+
+    def invalidate(self, label=None):
+        """Drop every entry, or only those for one lesion label. Returns the number removed."""
+        if label is None:
+            return self._delete()
+        return self._delete("label", label)
@@ -0,0 +1,65 @@
+# search_cache.py
+#
+# Persistent cache of search provider responses. Patients with the same
+# lesion produce the same or near-identical queries, so a Tavily response
+# fetched once can be served again until it expires. In replay mode the
+# cache is the only source: misses fail instead of going to the network,
+# which lets CI run the graph deterministically and offline.
+
+import hashlib
+import json
+import os
+import re
+
+from LLM.AI_Doctor.sqlite_cache import SqliteCache
+
+SEARCH_CACHE_PATH = os.environ.get(
+    "SEARCH_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_cache.sqlite3")
+)
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", str(24 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", "2000"))
+# "on": read through the cache, "off": always search, "replay": serve only from the cache
+SEARCH_CACHE_MODE = os.environ.get("SEARCH_CACHE_MODE", "on")
+
+CACHE_MODES = ("on", "off", "replay")
+
+
+class SearchCacheMiss(LookupError):
+    """Raised in replay mode when a query has no cached response."""
+
+
+def normalize_query(query):
+    """Lowercase, drop punctuation and collapse whitespace, so trivially different queries share an entry."""
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+def make_search_key(provider, query, max_results, include_raw_content):
+    raw = json.dumps([provider, normalize_query(query), int(max_results), bool(include_raw_content)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SearchResultCache(SqliteCache):
+    """Search responses, with a TTL and least-recently-used eviction.
+
+    A file recorded in "on" mode is what replay serves, so expired responses
+    are only refetched over, never deleted; the size bound still applies.
+    """
+
+    table = "search_cache"
+    columns = (("provider", "TEXT"), ("query", "TEXT"), ("response", "TEXT"))
+    value_column = "response"
+    keep_expired = True
+
+    def __init__(self, path=SEARCH_CACHE_PATH, ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_MAX_ENTRIES):
+        super().__init__(path, ttl, max_entries)
+
+    def get(self, key, allow_expired=False):
+        response = self._lookup(key, allow_expired)
+        return json.loads(response) if response is not None else None
+
+    def put(self, key, provider, query, response):
+        self._store(key, provider, normalize_query(query), json.dumps(response))
+
+    def invalidate(self):
+        """Drop every entry. Returns the number removed."""
+        return self._delete()
@@ -0,0 +1,145 @@
+# search_providers.py
+#
+# Backends for the web_research node. Every provider returns a Tavily-shaped
+# response ({"results": [{"title", "url", "content", "raw_content"}, ...]})
+# so the graph does not care where the sources came from.
+
+import hashlib
+import os
+import time
+
+from LLM.AI_Doctor.graph_metrics import record_cache_lookup
+from LLM.AI_Doctor.knowledge_base import get_knowledge_base
+from LLM.AI_Doctor.search_cache import (CACHE_MODES, SEARCH_CACHE_MODE, SearchCacheMiss, SearchResultCache,
+                                        make_search_key)
+
+os.environ.setdefault("TAVILY_API_KEY", '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')
+
+# "tavily" searches the web, "knowledge_base" answers from config.ini offline,
+# "stub" returns canned results for tests and benchmarks
+DIAGNOSIS_SEARCH_PROVIDER = os.environ.get("DIAGNOSIS_SEARCH_PROVIDER", "tavily")
+
+
+class SearchProvider:
+    name = "base"
+    # Responses worth keeping in the on-disk search cache (remote, slow or billed)
+    cacheable = False
+
+    def search(self, query, include_raw_content=True, max_results=3):
+        raise NotImplementedError
+
+
+class TavilySearchProvider(SearchProvider):
+    name = "tavily"
+    cacheable = True
+
+    def __init__(self, client=None):
+        if client is None:
+            from tavily import TavilyClient
+            client = TavilyClient()
+        self.client = client
+
+    def search(self, query, include_raw_content=True, max_results=3):
+        return self.client.search(query,
+                            max_results=max_results,
+                            include_raw_content=include_raw_content)
+
+
+class KnowledgeBaseSearchProvider(SearchProvider):
+    name = "knowledge_base"
+
+    def __init__(self, knowledge_base=None):
+        self.knowledge_base = knowledge_base or get_knowledge_base()
+
+    def search(self, query, include_raw_content=True, max_results=3):
+        return self.knowledge_base.search(query, include_raw_content=include_raw_content, max_results=max_results)
+
+
+class StubSearchProvider(SearchProvider):
+    """Deterministic local provider: no network, optional fixed latency.
+
+    Results are derived from the normalized query, so the same query always
+    returns the same URLs and content (which is what dedup tests need), and
+    STUB_SEARCH_LATENCY simulates a network round trip.
+    """
+    name = "stub"
+
+    def __init__(self, latency=None):
+        self.latency = float(os.environ.get("STUB_SEARCH_LATENCY", "0")) if latency is None else latency
+
+    def search(self, query, include_raw_content=True, max_results=3):
+        if self.latency:
+            time.sleep(self.latency)
+        normalized = " ".join(query.lower().split())
+        slug = hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+        results = []
+        for i in range(max_results):
+            content = f"Stub result {i + 1} about {normalized}."
+            results.append({
+                "title": f"Stub: {normalized} ({i + 1})",
+                "url": f"https://stub.local/{slug}/{i + 1}",
+                "content": content,
+                "raw_content": content * 20 if include_raw_content else None,
+            })
+        return {"query": query, "results": results}
+
+
+class ReplayOnlyProvider(SearchProvider):
+    """Stands in for a remote provider in replay mode, where it is never called."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def search(self, query, include_raw_content=True, max_results=3):
+        raise SearchCacheMiss(f"{self.name} is not available in replay mode")
+
+
+class CachedSearchProvider(SearchProvider):
+    """Read-through SearchResultCache in front of another provider.
+
+    mode "on" serves fresh cached responses and stores new ones; "replay"
+    serves only from the cache (expired entries included) and raises
+    SearchCacheMiss instead of searching.
+    """
+
+    def __init__(self, provider, cache=None, mode=SEARCH_CACHE_MODE):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown search cache mode '{mode}', expected one of {CACHE_MODES}")
+        self.provider = provider
+        self.cache = cache or SearchResultCache()
+        self.mode = mode
+        # Same name as the wrapped provider: cached and live responses are interchangeable
+        self.name = provider.name
+
+    def search(self, query, include_raw_content=True, max_results=3):
+        key = make_search_key(self.name, query, max_results, include_raw_content)
+        cached = self.cache.get(key, allow_expired=self.mode == "replay")
+        record_cache_lookup("search", cached is not None)
+        if cached is not None:
+            return cached
+        if self.mode == "replay":
+            raise SearchCacheMiss(f"No cached {self.name} response for {query!r} (SEARCH_CACHE_MODE=replay)")
+        response = self.provider.search(query, include_raw_content=include_raw_content, max_results=max_results)
+        self.cache.put(key, self.name, query, response)
+        return response
+
+
+SEARCH_PROVIDERS = {
+    TavilySearchProvider.name: TavilySearchProvider,
+    KnowledgeBaseSearchProvider.name: KnowledgeBaseSearchProvider,
+    StubSearchProvider.name: StubSearchProvider,
+}
+
+def get_search_provider(name=None) -> SearchProvider:
+    name = name or DIAGNOSIS_SEARCH_PROVIDER
+    try:
+        provider_class = SEARCH_PROVIDERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown search provider '{name}', expected one of {sorted(SEARCH_PROVIDERS)}")
+    if provider_class.cacheable and SEARCH_CACHE_MODE == "replay":
+        # Replay never searches, so it must not need the live client (or its API key)
+        return CachedSearchProvider(ReplayOnlyProvider(name), mode="replay")
+    provider = provider_class()
+    if provider.cacheable and SEARCH_CACHE_MODE != "off":
+        provider = CachedSearchProvider(provider, mode=SEARCH_CACHE_MODE)
+    return provider
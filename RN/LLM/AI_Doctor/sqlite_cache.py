@@ -0,0 +1,100 @@
+# sqlite_cache.py
+#
+# The SQLite table behind the diagnosis result cache and the search cache:
+# one row per key with a TTL and least-recently-used eviction. Subclasses
+# name the table and its payload columns and build their own keys.
+
+import sqlite3
+import threading
+import time
+
+
+class SqliteCache:
+    """SQLite-backed cache with a TTL and least-recently-used eviction.
+
+    Every table has `cache_key`, the payload `columns` and the `created_at`
+    and `last_access` timestamps. With `keep_expired`, an expired row is a
+    miss but stays in the table, so a replay can still serve it; only the
+    size bound removes rows.
+    """
+
+    table = None
+    # (name, SQL type) of the payload columns, in storage order
+    columns = ()
+    # Payload column returned by a lookup
+    value_column = None
+    # Payload columns that invalidation filters on
+    indexed_columns = ()
+    keep_expired = False
+
+    def __init__(self, path, ttl, max_entries):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        definitions = ", ".join([
+            "cache_key TEXT PRIMARY KEY",
+            *(f"{name} {sql_type} NOT NULL" for name, sql_type in self.columns),
+            "created_at REAL NOT NULL",
+            "last_access REAL NOT NULL",
+        ])
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} ({definitions})")
+            for column in ("last_access",) + tuple(self.indexed_columns):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_{column} ON {self.table} ({column})")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _lookup(self, key, allow_expired=False):
+        """The stored value for `key`, or None on a miss; counts the hit or miss."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {self.value_column}, created_at FROM {self.table} WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row and (allow_expired or now - row[1] <= self.ttl):
+                conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE cache_key = ?", (now, key))
+                self.hits += 1
+                return row[0]
+            if row and not self.keep_expired:
+                conn.execute(f"DELETE FROM {self.table} WHERE cache_key = ?", (key,))
+            self.misses += 1
+            return None
+
+    def _store(self, key, *values):
+        """Insert or replace `key` with the payload `values`, in `columns` order, then enforce the bounds."""
+        now = time.time()
+        placeholders = ", ".join("?" * (len(values) + 3))
+        with self._lock, self._connect() as conn:
+            conn.execute(f"INSERT OR REPLACE INTO {self.table} VALUES ({placeholders})", (key, *values, now, now))
+            if not self.keep_expired:
+                conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl,))
+            # Evict least recently used entries beyond the size bound
+            conn.execute(
+                f"""DELETE FROM {self.table} WHERE cache_key IN (
+                    SELECT cache_key FROM {self.table} ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+
+    def _delete(self, column=None, value=None):
+        """Drop every entry, or those whose `column` equals `value`. Returns the number removed."""
+        with self._lock, self._connect() as conn:
+            if column is None:
+                return conn.execute(f"DELETE FROM {self.table}").rowcount
+            return conn.execute(f"DELETE FROM {self.table} WHERE {column} = ?", (value,)).rowcount
+
+    def stats(self):
+        with self._connect() as conn:
+            entries = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
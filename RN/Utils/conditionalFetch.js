@@ -0,0 +1,24 @@
+// conditionalFetch.js
+// fetch() for the GET endpoints that send ETags (/getDetails, /getDoctors,
+// /getAppointments, /getAvailableSlots). The last body and ETag of each URL
+// are kept in memory and revalidated with If-None-Match, so refetching an
+// unchanged resource on screen focus costs an empty 304 instead of the
+// whole payload.
+const cache = new Map();
+
+export const conditionalFetch = async (url) => {
+  const cached = cache.get(url);
+  const response = await fetch(url, {
+    headers: cached ? { 'If-None-Match': cached.etag } : {},
+  });
+  if (response.status === 304 && cached) {
+    return { ok: true, status: 200, json: async () => cached.body };
+  }
+  const etag = response.headers.get('ETag');
+  if (!response.ok || !etag) {
+    return response;
+  }
+  const body = await response.json();
+  cache.set(url, { etag, body });
+  return { ok: true, status: response.status, json: async () => body };
+};
@@ -0,0 +1,98 @@
+# benchmarks/booking_stress.py
+#
+# Contention check for /bookAppointment: hundreds of different patients try
+# to book the same doctor and slot at once. Exactly one booking may succeed,
+# every other one must get 409, and the table must hold a single row for the
+# slot. Exits non-zero otherwise, so it can run in CI.
+#
+# Run from the RN directory (needs httpx and uvicorn):
+#   python -m benchmarks.booking_stress [--bookings 300] [--mode sync|async] [--database-url URL]
+# Without --database-url a temporary SQLite file stands in for MySQL.
+
+import argparse
+import asyncio
+import sys
+from collections import Counter
+from datetime import date, timedelta
+
+import httpx
+
+from benchmarks.common import create_bench_database
+from benchmarks.load_test import start_server
+from models import Appointment, Doctor, Patient, PatientInfo
+from unit_of_work import unit_of_work
+
+SLOT_DATE = date.today() + timedelta(days=7)
+SLOT_TIME = "10:00 AM"
+
+
+def seed(session_factory, patients):
+    with unit_of_work(session_factory()) as db:
+        doctor = Doctor(first_name="Stress", last_name="Test", clinic_name="Clinic", city="Chennai",
+                        specialty="Dermatology", years_of_experience=10)
+        db.add(doctor)
+        for i in range(patients):
+            patient = Patient(first_name="Stress", last_name=str(i), dob=date(1990, 1, 1), gender="Other")
+            db.add(patient)
+            db.flush()
+            db.add(PatientInfo(pid=patient.pid, email=f"stress{i}@example.com", city="Chennai",
+                               address="-", phone_no="-"))
+        db.flush()
+        return doctor.doc_id
+
+
+async def book_all(base_url, doctor_id, bookings):
+    limits = httpx.Limits(max_connections=bookings)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def book(i):
+            try:
+                response = await client.post("/bookAppointment", json={
+                    "doctorId": doctor_id,
+                    "date": SLOT_DATE.isoformat(),
+                    "time": SLOT_TIME,
+                    "patientEmail": f"stress{i}@example.com",
+                })
+                return response.status_code
+            except httpx.HTTPError as e:
+                return type(e).__name__
+
+        return Counter(await asyncio.gather(*(book(i) for i in range(bookings))))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookings", type=int, default=300)
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync")
+    parser.add_argument("--database-url")
+    parser.add_argument("--port", type=int, default=5200)
+    args = parser.parse_args()
+
+    engine, session_factory = create_bench_database(args.database_url)
+    doctor_id = seed(session_factory, args.bookings)
+    database_url = engine.url.render_as_string(hide_password=False)
+
+    process = start_server(args.mode, database_url, args.port)
+    try:
+        statuses = asyncio.run(book_all(f"http://127.0.0.1:{args.port}", doctor_id, args.bookings))
+    finally:
+        process.terminate()
+        process.wait()
+
+    db = session_factory()
+    try:
+        rows = db.query(Appointment).filter_by(doc_id=doctor_id, date=SLOT_DATE).count()
+    finally:
+        db.close()
+
+    print(f"{args.bookings} parallel bookings for one slot ({args.mode}, {engine.dialect.name})")
+    for status, count in sorted(statuses.items(), key=lambda item: str(item[0])):
+        print(f"  {status}: {count}")
+    print(f"  appointment rows for the slot: {rows}")
+
+    ok = statuses[200] == 1 and statuses[409] == args.bookings - 1 and rows == 1
+    print("✅ exactly one booking won" if ok else "❌ slot reservation is not atomic")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
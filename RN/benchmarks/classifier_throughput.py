@@ -0,0 +1,98 @@
+# benchmarks/classifier_throughput.py
+#
+# CPU throughput and latency of the lesion classifier under concurrent
+# uploads, with micro-batching off (batch size 1) and on. Uses the test
+# model from make_test_classifier.py (written on first run) unless
+# --model points at a real one, and synthetic JPEGs as input. Also checks
+# that batching does not change any prediction; exits non-zero if it does.
+#
+# Run from the RN directory (needs onnx, onnxruntime, numpy and Pillow):
+#   python -m benchmarks.classifier_throughput [--requests 512] [--concurrency 16] [--batch-size 8] [--max-wait-ms 10]
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.make_test_classifier import DEFAULT_OUTPUT, write_test_model
+from lesion_classifier import LesionClassifier, OnnxBackend
+
+
+def synthetic_images(count, size=400, seed=0):
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8)).save(buffer, format="JPEG")
+        images.append(buffer.getvalue())
+    return images
+
+
+def run(classifier, images, requests, concurrency):
+    def timed(i):
+        started = time.perf_counter()
+        prediction = classifier.classify(images[i % len(images)])
+        return time.perf_counter() - started, prediction
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    stats = classifier.stats()
+    return {
+        "images_per_second": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "mean_batch": stats["mean_batch_size"],
+        # The rest of the wall time is decoding and resizing in the upload threads
+        "inference_seconds": stats["inference_seconds"],
+        "predictions": [prediction for _, prediction in results],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=None, help="ONNX model (default: generated test model)")
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--images", type=int, default=32)
+    args = parser.parse_args()
+
+    model = args.model
+    if model is None:
+        model = DEFAULT_OUTPUT if os.path.exists(DEFAULT_OUTPUT) else write_test_model()
+    backend = OnnxBackend(model)
+    images = synthetic_images(args.images)
+    print(f"{args.requests} classifications, {args.concurrency} concurrent, model {model} "
+          f"(input {backend.input_size[0]}x{backend.input_size[1]})")
+
+    results = {}
+    for batch_size in (1, args.batch_size):
+        classifier = LesionClassifier(backend, max_batch_size=batch_size, max_wait_ms=args.max_wait_ms)
+        classifier.classify(images[0])  # warm-up
+        results[batch_size] = result = run(classifier, images, args.requests, args.concurrency)
+        print(f"  batch {batch_size:>3}: {result['images_per_second']:8.1f} img/s  "
+              f"p50 {result['p50_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms  "
+              f"mean batch {result['mean_batch']:.1f}  inference {result['inference_seconds']:.2f}s")
+
+    unbatched, batched = results[1]["predictions"], results[args.batch_size]["predictions"]
+    ok = all(
+        a.code == b.code and abs(a.confidence - b.confidence) < 1e-4
+        for a, b in zip(unbatched, batched)
+    )
+    print("✅ batched predictions match" if ok else "❌ batching changed predictions")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
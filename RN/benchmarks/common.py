@@ -0,0 +1,43 @@
+# benchmarks/common.py
+#
+# Shared helpers for the benchmark and regression scripts: a throwaway
+# database bound to the server's models and counters for the statements
+# and commits an engine issues.
+
+import os
+import tempfile
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from models import Base
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.statements = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_statement)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_statement(self, *args):
+        self.statements += 1
+
+    def _on_commit(self, *args):
+        self.commits += 1
+
+    def reset(self):
+        self.statements = 0
+        self.commits = 0
+
+
+def create_bench_database(database_url=None):
+    """Create the schema on `database_url` (a temporary SQLite file by default)."""
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}"
+    engine = create_engine(database_url)
+    if engine.dialect.name == "sqlite":
+        # Make every commit durable, like MySQL with innodb_flush_log_at_trx_commit=1
+        event.listen(engine, "connect", lambda conn, _: conn.execute("PRAGMA synchronous=FULL"))
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
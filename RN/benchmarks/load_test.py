@@ -0,0 +1,134 @@
+# benchmarks/load_test.py
+#
+# Load-test harness comparing DB_MODE=sync and DB_MODE=async. For each mode a
+# uvicorn server is started against the same seeded database and hammered
+# with concurrent /getDetails, /getAppointments and /getAvailableSlots calls;
+# requests per second and latency percentiles are reported per mode.
+#
+# Run from the RN directory (needs httpx, uvicorn and aiosqlite/aiomysql):
+#   python -m benchmarks.load_test [--requests 2000] [--concurrency 64] [--database-url URL]
+# Without --database-url a temporary SQLite file stands in for MySQL.
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, time as dtime, timedelta
+
+import httpx
+
+from benchmarks.common import create_bench_database
+from benchmarks.make_test_classifier import DEFAULT_OUTPUT, write_test_model
+from models import Appointment, Doctor, Patient, PatientInfo, Record
+from unit_of_work import unit_of_work
+
+EMAIL = "loadtest@example.com"
+
+
+def seed(session_factory, appointments=20):
+    with unit_of_work(session_factory()) as db:
+        doctor = Doctor(first_name="Load", last_name="Test", clinic_name="Clinic", city="Chennai",
+                        specialty="Dermatology", years_of_experience=10)
+        db.add(doctor)
+        patient = Patient(first_name="Load", last_name="Test", dob=date(1990, 1, 1), gender="Other")
+        db.add(patient)
+        db.flush()
+        db.add(PatientInfo(pid=patient.pid, email=EMAIL, city="Chennai", address="-", phone_no="-"))
+        db.add(Record(pid=patient.pid, age=35, medical_history="", insured=False, notes=""))
+        for i in range(appointments):
+            db.add(Appointment(date=date.today() + timedelta(days=i), time=dtime(9, 0),
+                               pid=patient.pid, doc_id=doctor.doc_id))
+        return doctor.doc_id
+
+
+def start_server(mode, database_url, port):
+    # The server will not start without a lesion model, and no real one is committed;
+    # the stub search provider keeps uploads off the network and free of API keys
+    model = DEFAULT_OUTPUT if os.path.exists(DEFAULT_OUTPUT) else write_test_model()
+    env = dict(os.environ, DB_MODE=mode, DATABASE_URL=database_url,
+               DOCTOR_DIRECTORY_REFRESH_SECONDS="0", LESION_MODEL_PATH=model, DIAGNOSIS_SEARCH_PROVIDER="stub")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/modelStatus", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"{mode} server did not start on port {port}")
+
+
+async def hammer(base_url, doctor_id, total, concurrency):
+    paths = [
+        f"/getDetails?email={EMAIL}",
+        f"/getAppointments?email={EMAIL}",
+        f"/getAvailableSlots?doctor_id={doctor_id}&date={date.today():%Y-%m-%d}",
+    ]
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(paths[i % len(paths)])
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--database-url")
+    parser.add_argument("--port", type=int, default=5100)
+    args = parser.parse_args()
+
+    engine, session_factory = create_bench_database(args.database_url)
+    doctor_id = seed(session_factory)
+    database_url = engine.url.render_as_string(hide_password=False)
+
+    results = {}
+    for offset, mode in enumerate(("sync", "async")):
+        port = args.port + offset
+        process = start_server(mode, database_url, port)
+        try:
+            results[mode] = asyncio.run(hammer(f"http://127.0.0.1:{port}", doctor_id, args.requests, args.concurrency))
+        finally:
+            process.terminate()
+            process.wait()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {engine.dialect.name}")
+    print(f"{'mode':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for mode, result in results.items():
+        print(f"{mode:<8}{result['rps']:>10.1f}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/make_test_classifier.py
+#
+# Writes a small ONNX lesion classifier with the production model's
+# interface (float32 image batch in NCHW, seven HAM10000 class scores out)
+# and fixed random weights. Its predictions mean nothing; it exists so the
+# ONNX backend, batching and benchmark can run without the real model.
+#
+# Run from the RN directory (needs onnx):
+#   python -m benchmarks.make_test_classifier [--output PATH] [--size 128]
+
+import argparse
+import os
+
+import numpy as np
+import onnx
+from onnx import TensorProto, helper, numpy_helper
+
+from lesion_classifier import LESION_CLASSES
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lesion_test_model.onnx")
+
+
+def build_model(size=128, channels=32, seed=0):
+    rng = np.random.default_rng(seed)
+    weights = [
+        numpy_helper.from_array(rng.normal(0, 0.1, (channels, 3, 3, 3)).astype(np.float32), "conv1_w"),
+        numpy_helper.from_array(np.zeros(channels, dtype=np.float32), "conv1_b"),
+        numpy_helper.from_array(rng.normal(0, 0.1, (channels, channels, 3, 3)).astype(np.float32), "conv2_w"),
+        numpy_helper.from_array(np.zeros(channels, dtype=np.float32), "conv2_b"),
+        numpy_helper.from_array(rng.normal(0, 0.1, (channels, len(LESION_CLASSES))).astype(np.float32), "fc_w"),
+        numpy_helper.from_array(np.zeros(len(LESION_CLASSES), dtype=np.float32), "fc_b"),
+    ]
+    nodes = [
+        helper.make_node("Conv", ["image", "conv1_w", "conv1_b"], ["c1"], kernel_shape=[3, 3], strides=[2, 2], pads=[1, 1, 1, 1]),
+        helper.make_node("Relu", ["c1"], ["r1"]),
+        helper.make_node("Conv", ["r1", "conv2_w", "conv2_b"], ["c2"], kernel_shape=[3, 3], strides=[2, 2], pads=[1, 1, 1, 1]),
+        helper.make_node("Relu", ["c2"], ["r2"]),
+        helper.make_node("GlobalAveragePool", ["r2"], ["pooled"]),
+        helper.make_node("Flatten", ["pooled"], ["features"]),
+        helper.make_node("Gemm", ["features", "fc_w", "fc_b"], ["logits"]),
+        helper.make_node("Softmax", ["logits"], ["probabilities"], axis=1),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "lesion_test_classifier",
+        [helper.make_tensor_value_info("image", TensorProto.FLOAT, ["batch", 3, size, size])],
+        [helper.make_tensor_value_info("probabilities", TensorProto.FLOAT, ["batch", len(LESION_CLASSES)])],
+        initializer=weights,
+    )
+    # Pin the IR version so older onnxruntime releases can load what a newer onnx writes
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)], ir_version=8)
+    onnx.checker.check_model(model)
+    return model
+
+
+def write_test_model(output=DEFAULT_OUTPUT, size=128):
+    onnx.save(build_model(size), output)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--size", type=int, default=128)
+    args = parser.parse_args()
+    print(f"Wrote {write_test_model(args.output, args.size)}")
+
+
+if __name__ == "__main__":
+    main()
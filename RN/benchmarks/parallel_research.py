@@ -0,0 +1,69 @@
+# benchmarks/parallel_research.py
+#
+# Compares the search phase of serial and parallel research against the
+# local stub search provider (no network, fixed latency per call): N queries
+# one after another versus one concurrent fan-out. It also checks that the
+# merged results are deduplicated across queries by URL and by content.
+# Exits non-zero if the fan-out is not faster or dedup fails.
+#
+# Run from the RN directory:
+#   python -m benchmarks.parallel_research [--queries 3] [--latency 0.5] [--concurrency 3]
+
+import argparse
+import sys
+import time
+
+from LLM.AI_Doctor.diagnosis_engine import merge_search_responses, parallel_search
+from LLM.AI_Doctor.search_providers import StubSearchProvider
+
+QUERIES = [
+    "melanoma treatment options",
+    "melanoma warning signs",
+    "when to see a dermatologist for melanoma",
+    "melanoma medication side effects",
+    "melanoma prognosis by stage",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=3)
+    args = parser.parse_args()
+
+    provider = StubSearchProvider(latency=args.latency)
+    queries = QUERIES[:args.queries]
+
+    started = time.perf_counter()
+    serial = [provider.search(query, max_results=1) for query in queries]
+    serial_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fanned_out = parallel_search(provider.search, queries, concurrency=args.concurrency, max_results=1)
+    parallel_seconds = time.perf_counter() - started
+
+    print(f"{len(queries)} searches at {args.latency:.2f}s each")
+    print(f"  serial:   {serial_seconds:.2f}s")
+    print(f"  parallel: {parallel_seconds:.2f}s (concurrency {args.concurrency})")
+
+    ok = parallel_seconds < serial_seconds and fanned_out == serial
+
+    # The same query twice and a mirror of the first page under another URL collapse to one result each
+    mirror = dict(fanned_out[0]["results"][0], url="https://mirror.local/page")
+    merged = merge_search_responses(fanned_out + [fanned_out[0], {"results": [mirror]}])
+    expected = len(queries)
+    print(f"  merged {sum(len(r['results']) for r in fanned_out) + 2} results into {len(merged['results'])} "
+          f"(expected {expected})")
+    ok = ok and len(merged["results"]) == expected
+
+    # URLs read in an earlier loop are dropped
+    merged = merge_search_responses(fanned_out, seen_urls=[fanned_out[0]["results"][0]["url"]])
+    ok = ok and len(merged["results"]) == expected - 1
+
+    print("✅ fan-out and dedup OK" if ok else "❌ fan-out or dedup regression")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/query_counts.py
+#
+# Query-count regression check for the read endpoints. Each endpoint is
+# called against a small and a large data set; the number of SQL statements
+# must stay within a fixed budget and must not grow with the row count.
+# Exits non-zero on a regression, so it can run in CI.
+#
+# Run from the RN directory:
+#   python -m benchmarks.query_counts
+
+import sys
+from datetime import date, time, timedelta
+
+from fastapi import Request, Response
+
+from benchmarks.common import StatementCounter, create_bench_database
+from server import (Appointment, Doctor, Patient, PatientInfo, Record,
+                    cancel_appointment, get_appointments, get_details)
+from unit_of_work import unit_of_work
+
+# Maximum statements per call, including the DELETE of /cancelAppointment
+BUDGETS = {
+    "/getDetails": 2,
+    "/getAppointments": 2,
+    "/cancelAppointment": 2,
+}
+
+
+def seed(session_factory, email, appointments):
+    with unit_of_work(session_factory()) as db:
+        patient = Patient(first_name="Query", last_name="Count", dob=date(1990, 1, 1), gender="Other")
+        db.add(patient)
+        db.flush()
+        db.add(PatientInfo(pid=patient.pid, email=email, city="Chennai", address="-", phone_no="-"))
+        db.add(Record(pid=patient.pid, age=35, medical_history="", insured=False, notes=""))
+        app_ids = []
+        for i in range(appointments):
+            doctor = Doctor(first_name=f"Doc{i}", last_name="Bench", clinic_name="Clinic", city="Chennai",
+                            specialty="Dermatology", years_of_experience=5)
+            db.add(doctor)
+            db.flush()
+            appointment = Appointment(date=date.today() + timedelta(days=i - appointments // 2),
+                                      time=time(9, 0), pid=patient.pid, doc_id=doctor.doc_id)
+            db.add(appointment)
+            db.flush()
+            app_ids.append(appointment.app_id)
+    return app_ids
+
+
+def plain_request():
+    """A GET without conditional headers, so the endpoints always build the full response."""
+    return Request({"type": "http", "method": "GET", "headers": []})
+
+
+def count(engine, session_factory, call):
+    counter = StatementCounter(engine)
+    db = session_factory()
+    try:
+        call(db)
+    finally:
+        db.close()
+    return counter.statements
+
+
+def main():
+    engine, session_factory = create_bench_database()
+    counts = {}
+    for rows in (1, 50):
+        email = f"patient{rows}@example.com"
+        app_ids = seed(session_factory, email, rows)
+        counts[rows] = {
+            "/getDetails": count(engine, session_factory,
+                                 lambda db: get_details(request=plain_request(), response=Response(),
+                                                        email=email, db=db)),
+            "/getAppointments": count(engine, session_factory,
+                                      lambda db: get_appointments(request=plain_request(), response=Response(),
+                                                                  email=email, db=db)),
+            "/cancelAppointment": count(engine, session_factory,
+                                        lambda db: cancel_appointment(appointment_id=app_ids[0], db=db)),
+        }
+
+    failures = []
+    for endpoint, budget in BUDGETS.items():
+        small, large = counts[1][endpoint], counts[50][endpoint]
+        status = "ok"
+        if large > budget or small != large:
+            status = "FAIL"
+            failures.append(endpoint)
+        print(f"{endpoint:<20} 1 row: {small:>3}  50 rows: {large:>3}  budget: {budget:>3}  {status}")
+
+    if failures:
+        sys.exit(f"Query count regression in {', '.join(failures)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/upload_commits.py
+#
+# Compares the database work done by the /upload write path before and after
+# the unit-of-work change: statements sent, commits (each one is a durable
+# log flush / fsync on MySQL with innodb_flush_log_at_trx_commit=1, and on
+# SQLite with synchronous=FULL) and wall time per request.
+#
+# Run from the RN directory:
+#   python -m benchmarks.upload_commits [iterations] [database_url]
+
+import sys
+import time
+from datetime import date
+
+from benchmarks.common import StatementCounter, create_bench_database
+from lesion_classifier import LesionPrediction
+from server import AIDoctor, AIDoctorInfo, Image, Lesion, LesionType, Patient, Record, save_diagnosis
+from unit_of_work import unit_of_work
+
+DIAGNOSIS = "## Summary\n\nbenchmark diagnosis\n\n ### Sources:\n* kb : kb://bench"
+PREDICTION = LesionPrediction(code="nv", confidence=1.0, probabilities={"nv": 1.0})
+
+
+def legacy_upload(db, record_id):
+    """The write sequence /upload used before: one commit (and refresh) per row."""
+    new_image = Image(name="bench.jpg", content_type="image/jpeg", sha256="0" * 64, size=1)
+    db.add(new_image)
+    db.commit()
+    db.refresh(new_image)
+
+    new_ai_doctor = AIDoctor(diagnosis=DIAGNOSIS, severity_level="Medium")
+    db.add(new_ai_doctor)
+    db.commit()
+    db.refresh(new_ai_doctor)
+
+    db.add(AIDoctorInfo(rep_id=new_ai_doctor.rep_id, prescription=DIAGNOSIS))
+    db.commit()
+
+    latest_record = db.query(Record).filter_by(record_id=record_id).first()
+    latest_record.rep_id = new_ai_doctor.rep_id
+    db.commit()
+
+    db.add(Lesion(image_file_name="bench.jpg", lesion_type=LesionType.NEVUS, pid=latest_record.pid,
+                  report_id=latest_record.record_id, doc_id=None, previous_prescription="none"))
+    db.commit()
+
+
+def unit_of_work_upload(db, record_id):
+    """The current sequence: image in the upload transaction, report in one job transaction."""
+    with unit_of_work(db):
+        new_image = Image(name="bench.jpg", content_type="image/jpeg", sha256="0" * 64, size=1)
+        db.add(new_image)
+        db.flush()
+    save_diagnosis(db, DIAGNOSIS, record_id, [("bench.jpg", "none", PREDICTION)])
+
+
+def run(scenario, session_factory, counters, record_id, iterations):
+    counters.reset()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        db = session_factory()
+        try:
+            scenario(db, record_id)
+        finally:
+            db.close()
+    elapsed = time.perf_counter() - started
+    return {
+        "statements": counters.statements / iterations,
+        "commits": counters.commits / iterations,
+        "ms": elapsed * 1000 / iterations,
+    }
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    engine, session_factory = create_bench_database(sys.argv[2] if len(sys.argv) > 2 else None)
+
+    with unit_of_work(session_factory()) as db:
+        patient = Patient(first_name="Bench", last_name="Mark", dob=date(1990, 1, 1), gender="Other")
+        db.add(patient)
+        db.flush()
+        record = Record(pid=patient.pid, age=35, medical_history="", insured=False, notes="")
+        db.add(record)
+        db.flush()
+        record_id = record.record_id
+
+    counters = StatementCounter(engine)
+    results = {
+        "legacy (commit per row)": run(legacy_upload, session_factory, counters, record_id, iterations),
+        "unit of work": run(unit_of_work_upload, session_factory, counters, record_id, iterations),
+    }
+
+    print(f"{iterations} uploads against {engine.dialect.name}")
+    print(f"{'scenario':<26}{'statements':>12}{'commits':>10}{'ms/request':>12}")
+    for name, result in results.items():
+        print(f"{name:<26}{result['statements']:>12.1f}{result['commits']:>10.1f}{result['ms']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# diagnosis_jobs.py
+#
+# Background job queue for the AI diagnosis pipeline. The research graph takes
+# minutes per image, so /upload only queues a job here and returns its id; the
+# client then polls /diagnosis/{job_id} or follows the streaming variant.
+# Jobs submitted with stream_events=True also publish progress events (graph
+# node transitions, LLM tokens) to whoever is subscribed at the time; nothing
+# but the current stage is kept for clients that connect later.
+
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """Raised when the number of pending jobs has reached the configured limit."""
+
+
+@dataclass(kw_only=True)
+class DiagnosisJob:
+    job_id: str
+    image_id: Optional[int] = None
+    status: str = QUEUED
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # Graph node the job is currently in, from its progress events
+    stage: Optional[str] = None
+    # Bumped on every state change so streaming clients can tell when to emit
+    version: int = 0
+    subscribers: list = field(default_factory=list, repr=False)
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "image_id": self.image_id,
+            "status": self.status,
+            "stage": self.stage,
+            "diagnosis": self.result if self.status == DONE else None,
+            "error": self.error,
+        }
+
+
+class DiagnosisJobQueue:
+    """Runs diagnosis jobs on a bounded worker pool.
+
+    `max_workers` caps how many LLM runs happen at once, `max_pending` caps how
+    many jobs may wait behind them. Finished jobs are kept for `retention`
+    seconds so clients can still collect the result.
+    """
+
+    def __init__(self, max_workers=1, max_pending=32, retention=3600):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="diagnosis")
+        self._jobs: dict[str, DiagnosisJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, image_id=None, stream_events=False, **kwargs) -> DiagnosisJob:
+        """Queue `fn(*args, **kwargs)`; with stream_events it also gets an `on_event` callback."""
+        job, = self._admit([image_id])
+        self._start(job, fn, args, kwargs, stream_events)
+        return job
+
+    def submit_many(self, calls, stream_events=False) -> list:
+        """Queue several `(fn, args, image_id)` calls; either all are accepted or JobQueueFull is raised."""
+        jobs = self._admit([image_id for _, _, image_id in calls])
+        for job, (fn, args, _) in zip(jobs, calls):
+            self._start(job, fn, args, {}, stream_events)
+        return jobs
+
+    def _admit(self, image_ids):
+        with self._lock:
+            self._prune()
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending + len(image_ids) > self.max_workers + self.max_pending:
+                raise JobQueueFull(f"{pending} diagnosis jobs already pending")
+            jobs = [DiagnosisJob(job_id=uuid.uuid4().hex, image_id=image_id) for image_id in image_ids]
+            for job in jobs:
+                self._jobs[job.job_id] = job
+        return jobs
+
+    def _start(self, job, fn, args, kwargs, stream_events):
+        if stream_events:
+            kwargs["on_event"] = lambda event: self.publish(job, event)
+        self._executor.submit(self._run, job, fn, args, kwargs)
+
+    def get(self, job_id) -> Optional[DiagnosisJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    # --- Progress events ---
+    def subscribe(self, job, max_pending=256) -> asyncio.Queue:
+        """Return a queue receiving the job's progress events; call from the event loop."""
+        queue = asyncio.Queue(maxsize=max_pending)
+        with self._lock:
+            job.subscribers.append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, job, queue):
+        with self._lock:
+            job.subscribers[:] = [(loop, q) for loop, q in job.subscribers if q is not queue]
+
+    def publish(self, job, event):
+        """Hand `event` to every subscriber; called from the worker thread."""
+        if event.get("type") == "node" and event.get("state") == "start":
+            self._update(job, stage=event["node"])
+        with self._lock:
+            subscribers = list(job.subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                # The subscriber's event loop has already closed
+                pass
+
+    @staticmethod
+    def _offer(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client that cannot keep up loses tokens, not memory; the
+            # final status event still carries the full diagnosis
+            pass
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            "queued": statuses.count(QUEUED),
+            "running": statuses.count(RUNNING),
+            "done": statuses.count(DONE),
+            "failed": statuses.count(FAILED),
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+        }
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job, fn, args, kwargs):
+        self._update(job, status=RUNNING, started_at=time.time())
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            print(f"❌ Diagnosis job {job.job_id} failed: {e}")
+            self._update(job, status=FAILED, error=str(e), finished_at=time.time())
+        else:
+            self._update(job, status=DONE, result=result, finished_at=time.time())
+
+    def _update(self, job, **changes):
+        with self._lock:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.version += 1
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
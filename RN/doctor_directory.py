@@ -0,0 +1,170 @@
+# doctor_directory.py
+#
+# In-memory index of the doctor table for /getDoctors. The table is loaded
+# once at startup, kept current from ORM change events in this process and
+# reloaded periodically in the background for changes made elsewhere (e.g.
+# the CSV importer), so lookups never touch MySQL on the request path.
+
+import bisect
+import difflib
+import threading
+import unicodedata
+from collections import defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+FALLBACK_CITY = "chennai"
+FUZZY_CUTOFF = 0.8
+
+
+def normalize(value):
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    return " ".join(value.lower().split())
+
+
+class DoctorDirectory:
+    """City / specialty / clinic index over doctor records (plain dicts keyed by doc_id)."""
+
+    def __init__(self, loader, refresh_interval=300):
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._refresher = None
+        self._by_id = {}
+        self._by_city = defaultdict(set)
+        self._cities = []
+        # Bumped on every change to the indexed records
+        self.version = 0
+
+    # --- Loading and incremental updates ---
+    def reload(self):
+        records = list(self.loader())
+        by_id = {record["doc_id"]: record for record in records}
+        by_city = defaultdict(set)
+        for record in records:
+            by_city[normalize(record["city"])].add(record["doc_id"])
+        with self._lock:
+            changed = by_id != self._by_id
+            self._by_id = by_id
+            self._by_city = by_city
+            self._cities = sorted(by_city)
+            if changed:
+                self.version += 1
+        return len(by_id)
+
+    def upsert(self, record):
+        with self._lock:
+            self._discard(record["doc_id"])
+            self._by_id[record["doc_id"]] = record
+            city = normalize(record["city"])
+            if city not in self._by_city:
+                bisect.insort(self._cities, city)
+            self._by_city[city].add(record["doc_id"])
+            self.version += 1
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._discard(doc_id)
+            self.version += 1
+
+    def _discard(self, doc_id):
+        old = self._by_id.pop(doc_id, None)
+        if old is None:
+            return
+        city = normalize(old["city"])
+        ids = self._by_city.get(city)
+        if ids is not None:
+            ids.discard(doc_id)
+            if not ids:
+                del self._by_city[city]
+                self._cities.remove(city)
+
+    def track_changes(self, model, serialize):
+        """Apply committed inserts/updates/deletes of `model` to the index.
+
+        Changes are collected per session and only applied after commit, so
+        rolled back writes never reach the directory.
+        """
+        def remember(session, change):
+            if session is not None:
+                session.info.setdefault("doctor_directory_changes", []).append(change)
+
+        @event.listens_for(model, "after_insert")
+        @event.listens_for(model, "after_update")
+        def on_write(mapper, connection, target):
+            remember(object_session(target), ("upsert", serialize(target)))
+
+        @event.listens_for(model, "after_delete")
+        def on_delete(mapper, connection, target):
+            remember(object_session(target), ("remove", target.doc_id))
+
+        @event.listens_for(Session, "after_commit")
+        def on_commit(session):
+            for action, value in session.info.pop("doctor_directory_changes", []):
+                if action == "upsert":
+                    self.upsert(value)
+                else:
+                    self.remove(value)
+
+        @event.listens_for(Session, "after_rollback")
+        def on_rollback(session):
+            session.info.pop("doctor_directory_changes", None)
+
+    def start(self):
+        if self._refresher is None and self.refresh_interval:
+            self._refresher = threading.Thread(target=self._refresh_loop, name="doctor-directory", daemon=True)
+            self._refresher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Doctor directory refresh failed: {e}")
+
+    # --- Lookups ---
+    def _match_cities(self, city):
+        query = normalize(city)
+        if not query:
+            return []
+        if query in self._by_city:
+            return [query]
+        # Prefix matches via bisect, then substring matches (the old ILIKE '%city%')
+        start = bisect.bisect_left(self._cities, query)
+        matches = []
+        for name in self._cities[start:]:
+            if not name.startswith(query):
+                break
+            matches.append(name)
+        matches.extend(name for name in self._cities if query in name and not name.startswith(query))
+        if matches:
+            return matches
+        return difflib.get_close_matches(query, self._cities, n=3, cutoff=FUZZY_CUTOFF)
+
+    def search(self, city, specialty=None, clinic=None, offset=0, limit=None):
+        """Return (total, page of doctor records) for a city, falling back to Chennai."""
+        with self._lock:
+            cities = self._match_cities(city) or self._match_cities(FALLBACK_CITY)
+            ids = set()
+            for name in cities:
+                ids.update(self._by_city[name])
+            records = [self._by_id[doc_id] for doc_id in sorted(ids)]
+        if specialty:
+            wanted = normalize(specialty)
+            records = [r for r in records if wanted in normalize(r["specialty"])]
+        if clinic:
+            wanted = normalize(clinic)
+            records = [r for r in records if wanted in normalize(r["clinic_name"])]
+        end = None if limit is None else offset + limit
+        return len(records), records[offset:end]
+
+    def __len__(self):
+        return len(self._by_id)
@@ -0,0 +1,45 @@
+# etags.py
+#
+# Conditional GET for the read endpoints the app refetches on every screen
+# focus. Each endpoint builds its ETag from version state it already has
+# (change counters, cache entry versions, slot bitmaps, an aggregate over
+# the rows) instead of hashing the response body, so a request whose
+# If-None-Match carries the current tag gets an empty 304 before anything
+# is serialized.
+
+import uuid
+
+from fastapi import Response
+
+# In-process change counters restart at 0, so tags built from them carry
+# this process' epoch; another worker or a restart never matches them
+PROCESS_EPOCH = uuid.uuid4().hex[:8]
+
+# Per-user data: any cache may keep it but must revalidate before reuse
+PRIVATE_REVALIDATE = "private, no-cache"
+# The doctor directory itself only picks up outside changes every few minutes
+DIRECTORY_CACHE_CONTROL = "public, max-age=60"
+
+
+def make_etag(*parts):
+    """Weak ETag over version parts: equal tags mean equivalent JSON, not identical bytes."""
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match uses weak comparison: W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def not_modified(request, response, etag, cache_control=PRIVATE_REVALIDATE):
+    """Tag `response`; return a 304 to send instead if the client already has `etag`, else None."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
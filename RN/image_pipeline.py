@@ -0,0 +1,159 @@
+# image_pipeline.py
+#
+# Turns an uploaded photo into what the server keeps: the photo itself at
+# full resolution and aspect ratio, and a small thumbnail for the app, both
+# EXIF-oriented and re-encoded without EXIF or other metadata (phone photos
+# carry GPS coordinates). The classifier's input, resized to the model's
+# input size, is produced alongside but never stored. Decoding a
+# multi-megabyte camera JPEG is CPU-bound and holds the GIL, so the work
+# runs in a process pool; the calling request thread only waits on the
+# result.
+
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from image_store import iter_chunks
+
+IMAGE_PREPROCESS_WORKERS = int(os.environ.get("IMAGE_PREPROCESS_WORKERS", str(os.cpu_count() or 1)))
+THUMBNAIL_SIZE = int(os.environ.get("THUMBNAIL_SIZE", "256"))
+THUMBNAIL_QUALITY = int(os.environ.get("THUMBNAIL_QUALITY", "80"))
+# Quality of the stored full-resolution JPEG; high enough for clinical viewing
+STORED_JPEG_QUALITY = int(os.environ.get("STORED_JPEG_QUALITY", "95"))
+# Larger uploads are rejected while they are being read
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+# Larger images are rejected before decoding
+MAX_IMAGE_PIXELS = int(os.environ.get("MAX_IMAGE_PIXELS", str(50_000_000)))
+
+THUMBNAIL_CONTENT_TYPE = "image/jpeg"
+
+# Pillow refuses images over twice this size instead of just warning
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+
+class InvalidImage(ValueError):
+    """The uploaded bytes are not a decodable image."""
+
+
+class UploadTooLarge(ValueError):
+    """The upload is larger than MAX_UPLOAD_BYTES."""
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    # Full resolution and aspect ratio, oriented, without metadata; this is what is stored and served
+    image: bytes
+    content_type: str
+    width: int
+    height: int
+    thumbnail: bytes
+    # Exactly the classifier's input size, lossless so the classifier sees the same pixels every time; not stored
+    classifier_input: bytes
+
+
+def read_upload(fileobj, max_bytes=MAX_UPLOAD_BYTES):
+    """Read an upload chunk by chunk, giving up as soon as it passes `max_bytes`."""
+    buffer = bytearray()
+    for chunk in iter_chunks(fileobj):
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes")
+    return bytes(buffer)
+
+
+def load_rgb(data, min_size=None):
+    """Decode and EXIF-orient `data` as RGB. Returns (image, source format).
+
+    With `min_size`, JPEGs are decoded at the smallest power-of-two scale
+    that still covers it, which skips most of the work on camera photos.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        source_format = image.format
+        if min_size is not None:
+            image.draft("RGB", (min_size, min_size))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise InvalidImage(f"Could not decode image: {e}") from e
+    return image, source_format
+
+
+def prepare_image(data, input_size, thumbnail_size=THUMBNAIL_SIZE, thumbnail_quality=THUMBNAIL_QUALITY):
+    """Decode, orient and re-encode one upload. Runs in a pool process."""
+    height, width = input_size
+    image, source_format = load_rgb(data)
+
+    # Re-encoding from pixels drops EXIF, GPS and any other metadata; photos stay JPEG, the rest lossless PNG
+    stored = io.BytesIO()
+    if source_format == "JPEG":
+        image.save(stored, format="JPEG", quality=STORED_JPEG_QUALITY, subsampling=0)
+        content_type = "image/jpeg"
+    else:
+        image.save(stored, format="PNG")
+        content_type = "image/png"
+
+    classifier_input = io.BytesIO()
+    image.resize((width, height), Image.BILINEAR).save(classifier_input, format="PNG")
+
+    thumbnail_image = image.copy()
+    thumbnail_image.thumbnail((thumbnail_size, thumbnail_size))
+    thumbnail = io.BytesIO()
+    thumbnail_image.save(thumbnail, format="JPEG", quality=thumbnail_quality, optimize=True)
+
+    return PreparedImage(
+        image=stored.getvalue(),
+        content_type=content_type,
+        width=image.width,
+        height=image.height,
+        thumbnail=thumbnail.getvalue(),
+        classifier_input=classifier_input.getvalue(),
+    )
+
+
+class ImagePipeline:
+    """Process pool running `prepare_image`, started on first use."""
+
+    def __init__(self, max_workers=IMAGE_PREPROCESS_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def prepare(self, data, input_size) -> PreparedImage:
+        """Blocks the calling thread (not the GIL) until a worker has processed `data`."""
+        return self._pool().submit(prepare_image, data, input_size).result()
+
+    def prepare_many(self, uploads, input_size) -> list:
+        """Process an iterable of uploads across the workers, results in order.
+
+        Each upload is handed to a worker as soon as it has been read, so
+        reading the next one overlaps with processing the previous ones.
+        """
+        futures = [self._pool().submit(prepare_image, data, input_size) for data in uploads]
+        prepared = []
+        for number, future in enumerate(futures, start=1):
+            try:
+                prepared.append(future.result())
+            except InvalidImage as e:
+                raise InvalidImage(f"Image {number}: {e}") from e
+        return prepared
+
+    def start(self):
+        """Start the workers now. Call early, before the server has started other threads:
+        with the fork start method the first task forks every worker at once."""
+        self._pool().submit(int).result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
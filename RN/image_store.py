@@ -0,0 +1,158 @@
+# image_store.py
+#
+# Content-addressed storage for uploaded images. Uploads are streamed to the
+# backend in chunks while their SHA-256 is computed; identical images are
+# stored once and the `image` table only keeps metadata, hash and size.
+
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class StoredImage:
+    sha256: str
+    size: int
+    deduplicated: bool
+
+
+def iter_chunks(fileobj, chunk_size=CHUNK_SIZE):
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+class ImageStore:
+    name = "base"
+
+    def save(self, fileobj) -> StoredImage:
+        raise NotImplementedError
+
+    def open(self, sha256, chunk_size=CHUNK_SIZE):
+        """Yield the stored bytes chunk by chunk."""
+        raise NotImplementedError
+
+    def exists(self, sha256) -> bool:
+        raise NotImplementedError
+
+
+class FilesystemImageStore(ImageStore):
+    """Stores each image once under <root>/<aa>/<sha256>."""
+
+    name = "filesystem"
+
+    def __init__(self, root):
+        # Directories are created on first save, so building the store (at import of server.py) touches nothing
+        self.root = root
+
+    def path_for(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def exists(self, sha256):
+        return os.path.exists(self.path_for(sha256))
+
+    def save(self, fileobj):
+        digest = hashlib.sha256()
+        size = 0
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in iter_chunks(fileobj):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    out.write(chunk)
+            sha256 = digest.hexdigest()
+            final_path = self.path_for(sha256)
+            if os.path.exists(final_path):
+                os.remove(tmp_path)
+                return StoredImage(sha256=sha256, size=size, deduplicated=True)
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(tmp_path, final_path)
+            return StoredImage(sha256=sha256, size=size, deduplicated=False)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def open(self, sha256, chunk_size=CHUNK_SIZE):
+        with open(self.path_for(sha256), "rb") as file:
+            yield from iter_chunks(file, chunk_size)
+
+
+class DatabaseImageStore(ImageStore):
+    """Stores images as ordered LargeBinary chunks in `chunk_model`'s table.
+
+    `chunk_model` needs `sha256`, `seq` and `data` columns; rows are written
+    and read one chunk at a time so no image is ever held whole in memory.
+    """
+
+    name = "database"
+
+    def __init__(self, session_factory, chunk_model):
+        self.session_factory = session_factory
+        self.chunk_model = chunk_model
+
+    def exists(self, sha256):
+        db = self.session_factory()
+        try:
+            return self._exists(db, sha256)
+        finally:
+            db.close()
+
+    def _exists(self, db, sha256):
+        table = self.chunk_model.__table__
+        return db.execute(
+            select(table.c.seq).where(table.c.sha256 == sha256).limit(1)
+        ).first() is not None
+
+    def save(self, fileobj):
+        # First pass hashes the upload (UploadFile is already spooled to disk)
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in iter_chunks(fileobj):
+            digest.update(chunk)
+            size += len(chunk)
+        sha256 = digest.hexdigest()
+
+        table = self.chunk_model.__table__
+        db = self.session_factory()
+        try:
+            if self._exists(db, sha256):
+                return StoredImage(sha256=sha256, size=size, deduplicated=True)
+            fileobj.seek(0)
+            for seq, chunk in enumerate(iter_chunks(fileobj)):
+                db.execute(insert(table).values(sha256=sha256, seq=seq, data=chunk))
+            db.commit()
+            return StoredImage(sha256=sha256, size=size, deduplicated=False)
+        except IntegrityError:
+            # The same image was stored concurrently by another upload
+            db.rollback()
+            return StoredImage(sha256=sha256, size=size, deduplicated=True)
+        finally:
+            db.close()
+
+    def open(self, sha256, chunk_size=CHUNK_SIZE):
+        table = self.chunk_model.__table__
+        db = self.session_factory()
+        try:
+            seq = 0
+            while True:
+                row = db.execute(
+                    select(table.c.data).where(table.c.sha256 == sha256, table.c.seq == seq)
+                ).first()
+                if row is None:
+                    break
+                yield row[0]
+                seq += 1
+        finally:
+            db.close()
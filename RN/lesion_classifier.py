@@ -0,0 +1,271 @@
+# lesion_classifier.py
+#
+# Classifies an uploaded lesion image into one of the seven HAM10000 classes.
+# The model is loaded once per process by a pluggable backend (ONNX Runtime
+# on the CPU by default) and requests from concurrent uploads are grouped
+# into micro-batches: the first request of a batch waits at most
+# LESION_BATCH_MAX_WAIT_MS for others to join, so one inference call serves
+# several uploads.
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image
+
+from image_pipeline import load_rgb
+
+# "onnx" runs the model at LESION_MODEL_PATH. "random" is the old placeholder
+# (no model needed) for benchmarks and development; it is never used unless set here.
+LESION_CLASSIFIER_BACKEND = os.environ.get("LESION_CLASSIFIER_BACKEND", "onnx")
+LESION_MODEL_PATH = os.environ.get(
+    "LESION_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "lesion_classifier.onnx")
+)
+LESION_BATCH_SIZE = int(os.environ.get("LESION_BATCH_SIZE", "8"))
+LESION_BATCH_MAX_WAIT_MS = float(os.environ.get("LESION_BATCH_MAX_WAIT_MS", "10"))
+# 0 lets ONNX Runtime use one thread per physical core
+LESION_ONNX_THREADS = int(os.environ.get("LESION_ONNX_THREADS", "0"))
+
+# Model output order: the HAM10000 `dx` codes, sorted
+LESION_CLASSES = ("akiec", "bcc", "bkl", "df", "mel", "nv", "vasc")
+LESION_LABELS = {
+    "akiec": "Actinic Keratosis (akiec)",
+    "bcc": "Basal Cell Carcinoma (bcc)",
+    "bkl": "Benign Keratosis (bkl)",
+    "df": "Dermatofibroma (df)",
+    "mel": "Melanoma (mel)",
+    "nv": "Melanocytic Nevus (nv)",
+    "vasc": "Vascular Lesion (vasc)",
+}
+
+DEFAULT_INPUT_SIZE = (224, 224)
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+class ClassifierUnavailable(RuntimeError):
+    """The configured backend cannot be loaded (missing package or model file)."""
+
+
+@dataclass(frozen=True)
+class LesionPrediction:
+    code: str
+    confidence: float
+    probabilities: dict
+
+    @property
+    def label(self):
+        return LESION_LABELS[self.code]
+
+
+def preprocess(image_bytes, input_size=DEFAULT_INPUT_SIZE):
+    """Decode, orient and normalize an image into a (3, H, W) float32 array.
+
+    Uploads arrive as image_pipeline's classifier input, already at this size, which makes the resize a no-op.
+    """
+    height, width = input_size
+    image, _ = load_rgb(image_bytes, max(height, width))
+    if image.size != (width, height):
+        image = image.resize((width, height), Image.BILINEAR)
+    array = np.asarray(image, dtype=np.float32) / 255.0
+    return ((array - IMAGENET_MEAN) / IMAGENET_STD).transpose(2, 0, 1)
+
+
+def to_probabilities(scores):
+    """Softmax raw logits; outputs that already are probabilities pass through."""
+    scores = np.asarray(scores, dtype=np.float32)
+    if scores.min() >= 0 and np.allclose(scores.sum(axis=1), 1.0, atol=1e-3):
+        return scores
+    exp = np.exp(scores - scores.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def make_prediction(probabilities):
+    best = int(np.argmax(probabilities))
+    return LesionPrediction(
+        code=LESION_CLASSES[best],
+        confidence=float(probabilities[best]),
+        probabilities={code: float(p) for code, p in zip(LESION_CLASSES, probabilities)},
+    )
+
+
+class ClassifierBackend:
+    name = "base"
+    input_size = DEFAULT_INPUT_SIZE
+
+    def predict(self, batch):
+        """Map an (N, 3, H, W) float32 batch to (N, len(LESION_CLASSES)) probabilities."""
+        raise NotImplementedError
+
+
+class OnnxBackend(ClassifierBackend):
+    name = "onnx"
+
+    def __init__(self, model_path=LESION_MODEL_PATH, intra_op_threads=LESION_ONNX_THREADS):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ClassifierUnavailable("onnxruntime is not installed (pip install onnxruntime)") from e
+        if not os.path.exists(model_path):
+            raise ClassifierUnavailable(f"No lesion model at {model_path} (set LESION_MODEL_PATH)")
+
+        options = onnxruntime.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.model_path = model_path
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Fixed spatial dims come from the model; symbolic ones fall back to the default
+        height, width = model_input.shape[2:4]
+        self.input_size = (
+            height if isinstance(height, int) else DEFAULT_INPUT_SIZE[0],
+            width if isinstance(width, int) else DEFAULT_INPUT_SIZE[1],
+        )
+
+    def predict(self, batch):
+        scores = self.session.run(None, {self.input_name: batch})[0]
+        return to_probabilities(scores)
+
+
+class RandomBackend(ClassifierBackend):
+    """Random class per image, the behaviour before a model was wired in. For development only."""
+
+    name = "random"
+
+    def __init__(self, seed=None):
+        print("⚠️ Lesion classifier backend is 'random': lesion types and confidences are NOT real predictions")
+        self._rng = np.random.default_rng(seed)
+
+    def predict(self, batch):
+        return self._rng.dirichlet(np.ones(len(LESION_CLASSES)), size=len(batch)).astype(np.float32)
+
+
+CLASSIFIER_BACKENDS = {
+    OnnxBackend.name: OnnxBackend,
+    RandomBackend.name: RandomBackend,
+}
+
+
+class LesionClassifier:
+    """Micro-batching front end for a backend.
+
+    Callers block in `classify()`; a single worker thread collects queued
+    images until `max_batch_size` are waiting or `max_wait_ms` has passed
+    since the first one arrived, then runs them through the backend at once.
+    Decoding happens in the caller's thread so it overlaps with inference.
+    """
+
+    def __init__(self, backend, max_batch_size=LESION_BATCH_SIZE, max_wait_ms=LESION_BATCH_MAX_WAIT_MS):
+        self.backend = backend
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.images = 0
+        self.largest_batch = 0
+        self.inference_seconds = 0.0
+        self._requests = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def classify(self, image_bytes, timeout=None) -> LesionPrediction:
+        return self.submit(image_bytes).result(timeout)
+
+    def classify_many(self, images, timeout=None) -> list:
+        """Classify several images; they are decoded first and queued together so they share batches."""
+        arrays = [preprocess(image_bytes, self.backend.input_size) for image_bytes in images]
+        futures = [self._enqueue(array) for array in arrays]
+        return [future.result(timeout) for future in futures]
+
+    def submit(self, image_bytes) -> Future:
+        return self._enqueue(preprocess(image_bytes, self.backend.input_size))
+
+    def _enqueue(self, array):
+        future = Future()
+        self._ensure_worker()
+        self._requests.put((array, future))
+        return future
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="lesion-classifier", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._predict(batch)
+
+    def _predict(self, batch):
+        arrays, futures = zip(*batch)
+        started = time.perf_counter()
+        try:
+            probabilities = self.backend.predict(np.stack(arrays))
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        with self._lock:
+            self.inference_seconds += time.perf_counter() - started
+            self.batches += 1
+            self.images += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+        for future, row in zip(futures, probabilities):
+            future.set_result(make_prediction(row))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.backend.name,
+                "batches": self.batches,
+                "images": self.images,
+                "largest_batch": self.largest_batch,
+                "mean_batch_size": self.images / self.batches if self.batches else 0.0,
+                "inference_seconds": self.inference_seconds,
+                "pending": self._requests.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+
+def create_backend(name=None, model_path=None):
+    name = name or LESION_CLASSIFIER_BACKEND
+    try:
+        backend_class = CLASSIFIER_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown lesion classifier backend '{name}', expected one of {sorted(CLASSIFIER_BACKENDS)}")
+    if backend_class is OnnxBackend:
+        return OnnxBackend(model_path or LESION_MODEL_PATH)
+    return backend_class()
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_classifier() -> LesionClassifier:
+    """Process-wide classifier; the model is loaded on first use.
+
+    Raises ClassifierUnavailable if the configured backend cannot load. There
+    is no silent fallback: random labels would be saved and shown to patients
+    as diagnoses, so the random backend has to be chosen explicitly.
+    """
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = LesionClassifier(create_backend())
+        return _classifier
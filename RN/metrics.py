@@ -0,0 +1,72 @@
+# metrics.py
+#
+# Prometheus metrics for the API. Request latency is a histogram per route
+# template; components that already keep their own counters (the Ollama
+# lifecycle, the diagnosis job queue, the result cache) are read on every
+# scrape instead of being mirrored. The research graph records its own
+# metrics in LLM/AI_Doctor/graph_metrics.py on the same default registry.
+
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to produce the response headers of an API request",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+
+
+async def observe_request(request, call_next):
+    """HTTP middleware recording REQUEST_SECONDS.
+
+    Routes are labelled by their template (/diagnosis/{job_id}), not the raw
+    path, to keep the label set bounded. For streaming responses this times
+    the headers, not the stream.
+    """
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_SECONDS.labels(
+            request.method, route.path if route is not None else "unmatched", str(status)
+        ).observe(time.perf_counter() - started)
+
+
+class StatsCollector(Collector):
+    """Exposes the numeric fields of `stats()` as gauges named `<prefix>_<field>`."""
+
+    def __init__(self, prefix, stats):
+        self.prefix = prefix
+        self.stats = stats
+
+    def describe(self):
+        # Without this the registry calls collect() at registration, i.e. at import time,
+        # which would build the research engine and load the lesion model
+        return []
+
+    def collect(self):
+        try:
+            stats = self.stats()
+        except Exception as e:
+            print(f"Could not collect {self.prefix} metrics: {e}")
+            return
+        for name, value in stats.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                yield GaugeMetricFamily(f"{self.prefix}_{name}", f"{name} from the {self.prefix} status", value=value)
+
+
+def register_stats(prefix, stats):
+    REGISTRY.register(StatsCollector(prefix, stats))
+
+
+def render_metrics():
+    """Return (body, content type) for the /metrics endpoint."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
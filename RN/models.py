@@ -0,0 +1,168 @@
+# models.py
+#
+# SQLAlchemy ORM models for every table. Kept apart from server.py so that
+# tools needing only the schema (the doctor CSV import, the benchmarks)
+# can import them without building the API, its image pipeline and job
+# queue, or the classifier and LLM clients.
+
+import enum
+
+from sqlalchemy import (Column, Integer, Float, String, Date, Time, ForeignKey, Boolean, Text, LargeBinary, Index,
+                        UniqueConstraint, Enum as SqlEnum)
+from sqlalchemy.orm import relationship, declarative_base
+
+Base = declarative_base()
+
+# --- Enum for Lesion Types ---
+class LesionType(enum.Enum):
+    MELANOMA = "Melanoma"
+    NEVUS = "Nevus"
+    BASAL_CELL_CARCINOMA = "Basal Cell Carcinoma"
+    ACTINIC_KERATOSIS = "Actinic Keratosis"
+    BENIGN_KERATOSIS = "Benign Keratosis"
+    DERMATOFIBROMA = "Dermatofibroma"
+    VASCULAR_LESION = "Vascular Lesion"
+
+# --- Models ---
+class Patient(Base):
+    __tablename__ = 'patient'
+    pid = Column(Integer, primary_key=True, autoincrement=True)
+    dob = Column(Date)
+    gender = Column(String(10))
+    first_name = Column(String(50), nullable=False)
+    last_name = Column(String(50), nullable=False)
+    doc_id = Column(Integer, ForeignKey('doctor.doc_id'))
+    
+    doctor = relationship('Doctor', back_populates='patients')
+    patient_info = relationship('PatientInfo', back_populates='patient', uselist=False)
+    appointments = relationship('Appointment', back_populates='patient')
+    lesions = relationship('Lesion', back_populates='patient')
+    records = relationship('Record', back_populates='patient')
+
+class PatientInfo(Base):
+    __tablename__ = 'patient_info'
+    pid = Column(Integer, ForeignKey('patient.pid', ondelete="CASCADE"), primary_key=True)
+    address = Column(String(255))
+    phone_no = Column(String(20))
+    email = Column(String(100), unique=True)
+    city = Column(String(100))
+    
+    patient = relationship('Patient', back_populates='patient_info')
+
+class Doctor(Base):
+    __tablename__ = 'doctor'
+    __table_args__ = (
+        Index('ix_doctor_city', 'city'),
+    )
+    doc_id = Column(Integer, primary_key=True, autoincrement=True)
+    first_name = Column(String(50))
+    last_name = Column(String(50))
+    clinic_name = Column(String(100))
+    city = Column(String(50))
+    specialty = Column(String(50))
+    years_of_experience = Column(Integer)
+    
+    doctor_info = relationship('DoctorInfo', back_populates='doctor', uselist=False)
+    patients = relationship('Patient', back_populates='doctor')
+    appointments = relationship('Appointment', back_populates='doctor')
+    lesions = relationship('Lesion', back_populates='doctor')
+
+class DoctorInfo(Base):
+    __tablename__ = 'doctor_info'
+    doc_id = Column(Integer, ForeignKey('doctor.doc_id'), primary_key=True)
+    prescription = Column(String(255))
+    
+    doctor = relationship('Doctor', back_populates='doctor_info')
+
+class Appointment(Base):
+    __tablename__ = 'appointment'
+    __table_args__ = (
+        # One booking per doctor and slot; also serves the (doc_id, date) slot lookups
+        UniqueConstraint('doc_id', 'date', 'time', name='uq_appointment_doctor_slot'),
+        Index('ix_appointment_pid', 'pid'),
+    )
+    app_id = Column(Integer, primary_key=True, autoincrement=True)
+    date = Column(Date)
+    time = Column(Time)
+    pid = Column(Integer, ForeignKey('patient.pid'))
+    doc_id = Column(Integer, ForeignKey('doctor.doc_id'))
+    
+    patient = relationship('Patient', back_populates='appointments')
+    doctor = relationship('Doctor', back_populates='appointments')
+
+class Lesion(Base):
+    __tablename__ = 'lesion'
+    __table_args__ = (
+        Index('ix_lesion_pid', 'pid'),
+    )
+    lesion_id = Column(Integer, primary_key=True, autoincrement=True)
+    previous_prescription = Column(String(255))
+    image_file_name = Column(String(255))
+    lesion_type = Column(SqlEnum(LesionType), nullable=False)
+    # Classifier score for lesion_type, 0-1
+    confidence = Column(Float)
+    pid = Column(Integer, ForeignKey('patient.pid'))
+    report_id = Column(Integer, ForeignKey('record.record_id'))
+    doc_id = Column(Integer, ForeignKey('doctor.doc_id'))
+
+    patient = relationship('Patient', back_populates='lesions')
+    doctor = relationship('Doctor', back_populates='lesions')
+
+class AIDoctor(Base):
+    __tablename__ = 'ai_doctor'
+    rep_id = Column(Integer, primary_key=True, autoincrement=True)
+    diagnosis = Column(Text)
+    severity_level = Column(String(50))
+    
+    ai_doctor_info = relationship('AIDoctorInfo', back_populates='ai_doctor', uselist=False)
+    records = relationship('Record', back_populates='ai_doctor')
+
+class AIDoctorInfo(Base):
+    __tablename__ = 'ai_doctor_info'
+    rep_id = Column(Integer, ForeignKey('ai_doctor.rep_id'), primary_key=True)
+    prescription = Column(Text)
+    
+    ai_doctor = relationship('AIDoctor', back_populates='ai_doctor_info')
+
+class Record(Base):
+    __tablename__ = 'record'
+    __table_args__ = (
+        Index('ix_record_pid', 'pid'),
+    )
+    record_id = Column(Integer, primary_key=True, autoincrement=True)
+    age = Column(Integer)
+    medical_history = Column(Text)
+    insured = Column(Boolean)
+    notes = Column(Text)
+    pid = Column(Integer, ForeignKey('patient.pid'))
+    rep_id = Column(Integer, ForeignKey('ai_doctor.rep_id'))
+    
+    record_info = relationship('RecordInfo', back_populates='record', cascade="all, delete-orphan")
+    patient = relationship('Patient', back_populates='records')
+    ai_doctor = relationship('AIDoctor', back_populates='records')
+
+class RecordInfo(Base):
+    __tablename__ = 'record_info'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    record_id = Column(Integer, ForeignKey('record.record_id'))
+    allergy = Column(String(255))
+    
+    record = relationship('Record', back_populates='record_info')
+
+class Image(Base):
+    __tablename__ = 'image'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    # The bytes live in the image store, addressed by their SHA-256
+    sha256 = Column(String(64), index=True)
+    size = Column(Integer)
+    thumbnail_sha256 = Column(String(64))
+    thumbnail_size = Column(Integer)
+
+class ImageChunk(Base):
+    __tablename__ = 'image_chunk'
+    sha256 = Column(String(64), primary_key=True)
+    seq = Column(Integer, primary_key=True, autoincrement=False)
+    data = Column(LargeBinary(length=16777215), nullable=False)
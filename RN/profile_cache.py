@@ -0,0 +1,185 @@
+# profile_cache.py
+#
+# Read-through cache of the profile document /getDetails returns, keyed by
+# normalized email. The Details and Profile screens fetch it every time they
+# open, while it only changes through /register and /updateUser; those
+# invalidate the entry when their transaction commits. Entries live in this
+# process (size-bounded, with a TTL) or, to share them between workers, in a
+# local Redis-compatible server.
+
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+PROFILE_LOOKUP_SECONDS = Histogram(
+    "profile_cache_lookup_seconds", "Time to produce a profile document, by cache outcome",
+    ["result"], buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1))
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+class MemoryProfileBackend:
+    """LRU dict with a TTL, for a single server process."""
+
+    name = "memory"
+
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class RedisProfileBackend:
+    """Entries as JSON strings with a Redis TTL; Redis' maxmemory policy bounds the size."""
+
+    name = "redis"
+
+    def __init__(self, url, ttl=300, prefix="profile:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("The redis profile cache backend needs the redis package (pip install redis)") from e
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(self.ttl))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def size(self):
+        return None
+
+
+class ProfileCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a load that overlapped one is not stored
+        self._generation = 0
+
+    def get(self, email, load):
+        """Return `(profile, version)` for `email`, loading and caching the profile on a miss.
+
+        `version` is new every time the profile is loaded from the database,
+        so it serves as the ETag of the cached document. A `load()` returning
+        None (no such user) gives `(None, None)` and is not cached, so a
+        registration right after a miss is seen immediately.
+        """
+        key = normalize_email(email)
+        started = time.perf_counter()
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            # The cache is an optimization; an unreachable Redis falls back to the database
+            print(f"Profile cache read failed: {e}")
+            entry = None
+            with self._lock:
+                self.errors += 1
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            PROFILE_LOOKUP_SECONDS.labels("hit").observe(time.perf_counter() - started)
+            return entry["profile"], entry["version"]
+
+        with self._lock:
+            self.misses += 1
+            generation = self._generation
+        profile = load()
+        if profile is None:
+            PROFILE_LOOKUP_SECONDS.labels("miss").observe(time.perf_counter() - started)
+            return None, None
+        entry = {"profile": profile, "version": uuid.uuid4().hex[:16]}
+        with self._lock:
+            current = generation == self._generation
+        if current:
+            try:
+                self.backend.set(key, entry)
+            except Exception as e:
+                print(f"Profile cache write failed: {e}")
+        PROFILE_LOOKUP_SECONDS.labels("miss").observe(time.perf_counter() - started)
+        return entry["profile"], entry["version"]
+
+    def invalidate(self, email):
+        with self._lock:
+            self._generation += 1
+        try:
+            self.backend.delete(normalize_email(email))
+        except Exception as e:
+            print(f"Profile cache invalidation failed: {e}")
+
+    def invalidate_on_commit(self, session, email):
+        """Drop `email`'s entry once `session` commits; a rollback leaves it alone."""
+        session.info.setdefault("profile_cache_invalidations", set()).add(email)
+
+    def track_sessions(self):
+        @event.listens_for(Session, "after_commit")
+        def on_commit(session):
+            for email in session.info.pop("profile_cache_invalidations", ()):
+                self.invalidate(email)
+
+        @event.listens_for(Session, "after_rollback")
+        def on_rollback(session):
+            session.info.pop("profile_cache_invalidations", None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "backend": self.backend.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "ttl_seconds": self.backend.ttl,
+            }
+        entries = self.backend.size()
+        if entries is not None:
+            stats["entries"] = entries
+            stats["max_entries"] = self.backend.max_entries
+        return stats
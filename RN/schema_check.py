@@ -0,0 +1,94 @@
+# schema_check.py
+#
+# Compares the indexes and unique constraints declared on the models with
+# what actually exists in the database. create_all() never alters existing
+# tables, so databases created by older versions miss them until migrated.
+#
+# Report only:          python -m schema_check
+# Create what's missing: python -m schema_check --apply
+
+import sys
+from dataclasses import dataclass
+
+from sqlalchemy import Index, UniqueConstraint, inspect
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import AddConstraint
+
+
+@dataclass(frozen=True)
+class MissingIndex:
+    table: str
+    name: str
+    columns: tuple
+    unique: bool
+    schema_item: object
+
+    def describe(self):
+        kind = "UNIQUE" if self.unique else "INDEX"
+        return f"{kind} {self.name} ON {self.table} ({', '.join(self.columns)})"
+
+
+def _declared(table):
+    for index in table.indexes:
+        yield index.name, tuple(c.name for c in index.columns), bool(index.unique), index
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.columns:
+            yield constraint.name, tuple(c.name for c in constraint.columns), True, constraint
+
+
+def find_missing_indexes(engine, metadata):
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = set()
+        for index in inspector.get_indexes(table.name):
+            existing.add((tuple(index["column_names"]), bool(index.get("unique"))))
+        for constraint in inspector.get_unique_constraints(table.name):
+            existing.add((tuple(constraint["column_names"]), True))
+        for name, columns, unique, item in _declared(table):
+            # Compare by columns, not name: MySQL names FK indexes after the constraint
+            if (columns, unique) in existing or (not unique and (columns, True) in existing):
+                continue
+            missing.append(MissingIndex(table.name, name, columns, unique, item))
+    return missing
+
+
+def create_missing_indexes(engine, metadata):
+    """Create every missing index; returns the ones that could not be created."""
+    failed = []
+    for item in find_missing_indexes(engine, metadata):
+        try:
+            with engine.begin() as conn:
+                if isinstance(item.schema_item, Index):
+                    item.schema_item.create(conn)
+                else:
+                    conn.execute(AddConstraint(item.schema_item))
+            print(f"Created {item.describe()}")
+        except SQLAlchemyError as e:
+            # Typically duplicate rows blocking a unique constraint
+            print(f"❌ Could not create {item.describe()}: {e}")
+            failed.append(item)
+    return failed
+
+
+def report_missing_indexes(engine, metadata):
+    missing = find_missing_indexes(engine, metadata)
+    for item in missing:
+        print(f"⚠️  Missing {item.describe()} - run `python -m schema_check --apply`")
+    return missing
+
+
+if __name__ == "__main__":
+    from database import engine
+    from models import Base
+
+    if "--apply" in sys.argv:
+        failed = create_missing_indexes(engine, Base.metadata)
+        sys.exit(1 if failed else 0)
+    missing = report_missing_indexes(engine, Base.metadata)
+    if not missing:
+        print("All declared indexes are present.")
+    sys.exit(1 if missing else 0)
@@ -6,6 +6,7 @@ import { Text, ActivityIndicator, Appbar, List, useTheme, Button, Snackbar } fro
 import { useNavigation } from '@react-navigation/native';
 import { onAuthStateChanged } from 'firebase/auth';
 import auth from '../services/firebase';
+import { conditionalFetch } from '../Utils/conditionalFetch';
 
 const AppointmentDetailsScreen = () => {
   const navigation = useNavigation();
@@ -33,7 +34,7 @@ const AppointmentDetailsScreen = () => {
 
   const fetchAppointments = (email) => {
     // Update with your actual server IP or domain
-    fetch(`http://192.168.215.143:5000/getAppointments?email=${email}`)
+    conditionalFetch(`http://192.168.215.143:5000/getAppointments?email=${email}`)
       .then((res) => res.json())
       .then((data) => {
         setAppointments({
@@ -4,20 +4,7 @@ import { Text, Button, useTheme, Appbar, Surface, Divider, Snackbar } from 'reac
 import { useNavigation, useRoute } from '@react-navigation/native';
 import { format, addMonths, subMonths, startOfMonth, endOfMonth, eachDayOfInterval, isSameDay, isToday, isBefore } from 'date-fns';
 import AsyncStorage from '@react-native-async-storage/async-storage';
-
-const timeSlots = [
-  '10:00 AM', '11:00 AM', '12:00 PM', '01:00 PM', 
-  '02:00 PM', '03:00 PM', '04:00 PM', '05:00 PM'
-];
-
-// Simulated booked slots - in a real app, you'd fetch these from your backend
-const getBookedSlots = (doctorId) => {
-  return {
-    '2025-04-12': ['10:00 AM', '02:00 PM'],
-    '2025-04-13': ['11:00 AM', '03:00 PM'],
-    '2025-04-14': ['01:00 PM', '04:00 PM'],
-  };
-};
+import { conditionalFetch } from '../Utils/conditionalFetch';
 
 const BookAppointmentScreen = () => {
   const theme = useTheme();
@@ -30,7 +17,9 @@ const BookAppointmentScreen = () => {
   const [selectedDate, setSelectedDate] = useState(null);
   const [selectedTime, setSelectedTime] = useState(null);
   const [viewMode, setViewMode] = useState('date'); // 'date' or 'time'
-  const [bookedSlots, setBookedSlots] = useState({});
+  // Slot grid and per-day { free, booked } for the visible month, from /getAvailableSlots
+  const [timeSlots, setTimeSlots] = useState([]);
+  const [availability, setAvailability] = useState({});
   const [patientEmail, setPatientEmail] = useState(null);
   const [snackbarVisible, setSnackbarVisible] = useState(false);
   const [snackbarMessage, setSnackbarMessage] = useState('');
@@ -51,45 +40,32 @@ const BookAppointmentScreen = () => {
     };
 
     fetchUserEmail();
-    
-    // In a real application, fetch the booked slots from your backend here
-    setBookedSlots(getBookedSlots(doctor.doc_id));
+  }, []);
 
-    // Also fetch real booked slots if available
-    fetchAvailableSlots();
-  }, [doctor.doc_id]);
+  useEffect(() => {
+    fetchAvailability();
+  }, [doctor.doc_id, currentMonth]);
 
-  const fetchAvailableSlots = async () => {
-    if (selectedDate) {
-      try {
-        const formattedDate = format(selectedDate, 'yyyy-MM-dd');
-        const response = await fetch(`http://192.168.215.143:5000/getAvailableSlots?doctor_id=${doctor.doc_id}&date=${formattedDate}`);
-        if (response.ok) {
-          const data = await response.json();
-          const updatedBookedSlots = { ...bookedSlots };
-          updatedBookedSlots[formattedDate] = data.booked_slots;
-          setBookedSlots(updatedBookedSlots);
-        }
-      } catch (error) {
-        console.error("Error fetching available slots:", error);
+  // One request for the whole visible month instead of one per selected date
+  const fetchAvailability = async () => {
+    try {
+      const startDate = format(startOfMonth(currentMonth), 'yyyy-MM-dd');
+      const endDate = format(endOfMonth(currentMonth), 'yyyy-MM-dd');
+      const response = await conditionalFetch(`http://192.168.215.143:5000/getAvailableSlots?doctor_id=${doctor.doc_id}&start_date=${startDate}&end_date=${endDate}`);
+      if (response.ok) {
+        const data = await response.json();
+        setTimeSlots(data.slots);
+        setAvailability(prev => ({ ...prev, ...data.availability[String(doctor.doc_id)] }));
       }
+    } catch (error) {
+      console.error("Error fetching available slots:", error);
     }
   };
 
   const onDateSelect = (day) => {
     setSelectedDate(day);
+    setSelectedTime(null);
     setViewMode('time');
-    const formattedDate = format(day, 'yyyy-MM-dd');
-    fetch(`http://192.168.215.143:5000/getAvailableSlots?doctor_id=${doctor.doc_id}&date=${formattedDate}`)
-      .then(response => response.json())
-      .then(data => {
-        const updatedBookedSlots = { ...bookedSlots };
-        updatedBookedSlots[formattedDate] = data.booked_slots;
-        setBookedSlots(updatedBookedSlots);
-      })
-      .catch(error => {
-        console.error("Error fetching available slots:", error);
-      });
   };
 
   const onTimeSelect = (time) => {
@@ -140,6 +116,11 @@ const BookAppointmentScreen = () => {
       const result = await response.json();
 
       if (!response.ok) {
+        if (response.status === 409) {
+          // Someone else took the slot; show the current state
+          setSelectedTime(null);
+          fetchAvailability();
+        }
         throw new Error(result.detail || 'Failed to book appointment');
       }
 
@@ -187,8 +168,10 @@ const BookAppointmentScreen = () => {
           
           {dateRange.map((date) => {
             const isSelected = selectedDate && isSameDay(date, selectedDate);
-            const isDisabled = isBefore(date, today) && !isToday(date);
-            const hasBookings = bookedSlots[format(date, 'yyyy-MM-dd')] && bookedSlots[format(date, 'yyyy-MM-dd')].length > 0;
+            const day = availability[format(date, 'yyyy-MM-dd')];
+            const isFull = day && day.free.length === 0;
+            const isDisabled = (isBefore(date, today) && !isToday(date)) || isFull;
+            const hasBookings = day && day.booked.length > 0;
             
             return (
               <TouchableOpacity
@@ -237,7 +220,7 @@ const BookAppointmentScreen = () => {
 
   const renderTimeSelection = () => {
     const dateKey = selectedDate ? format(selectedDate, 'yyyy-MM-dd') : '';
-    const bookedTimesForDate = bookedSlots[dateKey] || [];
+    const bookedTimesForDate = availability[dateKey] ? availability[dateKey].booked : [];
     const scrollStyle = { maxHeight: 200 };
 
     return (
@@ -22,6 +22,7 @@ import {
 import AsyncStorage from '@react-native-async-storage/async-storage';
 import { useNavigation } from '@react-navigation/native';
 import { DatePickerInput } from 'react-native-paper-dates';
+import { conditionalFetch } from '../Utils/conditionalFetch';
 
 const Details = () => {
   const theme = useTheme();
@@ -64,7 +65,7 @@ const Details = () => {
         const userDataString = await AsyncStorage.getItem('userData');
         if (userDataString) {
           const user = JSON.parse(userDataString);
-          const res = await fetch(`http://192.168.215.143:5000/getDetails?email=${user.email}`);
+          const res = await conditionalFetch(`http://192.168.215.143:5000/getDetails?email=${user.email}`);
           const data = await res.json();
           if (data.details) {
             const details = data.details;
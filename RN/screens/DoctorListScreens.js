@@ -3,6 +3,7 @@ import React, { useEffect, useState } from 'react';
 import { View, StyleSheet, SafeAreaView, ScrollView } from 'react-native';
 import { Text, Button, useTheme, Appbar, Divider } from 'react-native-paper';
 import { useNavigation, useRoute } from '@react-navigation/native';
+import { conditionalFetch } from '../Utils/conditionalFetch';
 
 const DoctorListScreen = () => {
   const theme = useTheme();
@@ -12,7 +13,7 @@ const DoctorListScreen = () => {
   const [doctors, setDoctors] = useState([]);
 
   useEffect(() => {
-    fetch(`http://192.168.215.144:5000/getDoctors?city=${encodeURIComponent(city)}`)
+    conditionalFetch(`http://192.168.215.144:5000/getDoctors?city=${encodeURIComponent(city)}`)
       .then(response => response.json())
       .then(data => {
         setDoctors(data.doctor);
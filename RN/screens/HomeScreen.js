@@ -13,6 +13,7 @@ import { ThemeContext } from '../context/ThemeContext';
 import { signOut, onAuthStateChanged, updateProfile } from 'firebase/auth';
 import auth from '../services/firebase';
 import ErrorBoundary from '../ErrorBoundary';
+import { conditionalFetch } from '../Utils/conditionalFetch';
 
 const HomeScreen = () => {
   const theme = useTheme();
@@ -52,7 +53,7 @@ const HomeScreen = () => {
   // Fetch user details
   const fetchDetails = useCallback(() => {
     if (currentUser?.email) {
-      fetch(`http://192.168.215.143:5000/getDetails?email=${currentUser.email}`)
+      conditionalFetch(`http://192.168.215.143:5000/getDetails?email=${currentUser.email}`)
         .then(res => res.json())
         .then(data => {
           const patient = data.details?.patient;
@@ -174,7 +175,7 @@ const HomeScreen = () => {
       setUploadProgress(1);
       
       navigation.navigate('ResultScreen', {
-        diagnosis: result.diagnosis,
+        job_id: result.job_id,
         image_id: result.image_id
       });
     } catch (error) {
@@ -4,6 +4,7 @@ import { View, StyleSheet, SafeAreaView, ScrollView } from 'react-native';
 import { Text, Appbar, Avatar, useTheme, Button, ActivityIndicator } from 'react-native-paper';
 import { useNavigation } from '@react-navigation/native';
 import auth from '../services/firebase';
+import { conditionalFetch } from '../Utils/conditionalFetch';
 
 const ProfileScreen = () => {
   const theme = useTheme();
@@ -21,7 +22,7 @@ const ProfileScreen = () => {
         return;
       }
       try {
-        const res = await fetch(`http://localhost:5000/getDetails?email=${currentUser.email}`);
+        const res = await conditionalFetch(`http://localhost:5000/getDetails?email=${currentUser.email}`);
         const data = await res.json();
         if (res.ok) {
           setProfile(data.details);
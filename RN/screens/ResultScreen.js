@@ -1,27 +1,122 @@
 // screens/ResultScreen.js
 import React, { useContext, useEffect, useState } from 'react';
-import { View, StyleSheet, SafeAreaView, ScrollView, Alert } from 'react-native';
+import { View, StyleSheet, SafeAreaView, ScrollView, Alert, Image } from 'react-native';
 import { Text, Button, useTheme, IconButton, Appbar, Surface, Divider } from 'react-native-paper';
 import { useNavigation, useRoute } from '@react-navigation/native';
 import { ThemeContext } from '../context/ThemeContext';
 import { Feather } from '@expo/vector-icons';
 import AsyncStorage from '@react-native-async-storage/async-storage';
+import { conditionalFetch } from '../Utils/conditionalFetch';
+
+const STAGE_LABELS = {
+  generate_query: 'Planning the research...',
+  web_research: 'Searching medical sources...',
+  summarize_sources: 'Writing the summary...',
+  reflect_on_summary: 'Checking for gaps...',
+  finalize_summary: 'Finishing up...',
+};
 
 const ResultScreen = () => {
   const theme = useTheme();
   const navigation = useNavigation();
   const route = useRoute();
   const { isDarkTheme, toggleTheme } = useContext(ThemeContext);
-  const { diagnosis, image_id } = route.params || {};
+  const { job_id, image_id } = route.params || {};
+  const [diagnosis, setDiagnosis] = useState(route.params?.diagnosis);
+  const [jobStatus, setJobStatus] = useState(job_id ? 'queued' : null);
+  // Live progress from the SSE stream: current graph node and the summary being written
+  const [stage, setStage] = useState(null);
+  const [partialDiagnosis, setPartialDiagnosis] = useState('');
   const [city, setCity] = useState(route.params?.city);
 
+  // The diagnosis runs as a background job on the server. Follow its SSE
+  // stream for node transitions and tokens; fall back to polling if the
+  // stream fails. fetch() cannot read a streaming body in React Native, so
+  // the stream is read incrementally through XMLHttpRequest.
+  useEffect(() => {
+    if (!job_id || diagnosis) return;
+    let cancelled = false;
+    let timer = null;
+    let xhr = null;
+
+    const applyStatus = (data) => {
+      setJobStatus(data.status);
+      if (data.stage) setStage(data.stage);
+      if (data.status === 'done') setDiagnosis(data.diagnosis);
+    };
+
+    const handleEvent = (type, data) => {
+      if (type === 'status') {
+        applyStatus(data);
+      } else if (type === 'node') {
+        setStage(data.node);
+        // Each summarize_sources pass rewrites the whole summary
+        if (data.node === 'summarize_sources' && data.state === 'start') setPartialDiagnosis('');
+      } else if (type === 'token' && data.node === 'summarize_sources') {
+        setPartialDiagnosis(prev => prev + data.text);
+      }
+    };
+
+    const stream = () => {
+      xhr = new XMLHttpRequest();
+      let parsed = 0;
+      let finished = false;
+      xhr.open('GET', `http://192.168.215.143:5000/diagnosis/${job_id}/stream`);
+      xhr.setRequestHeader('Accept', 'text/event-stream');
+      xhr.onprogress = () => {
+        const text = xhr.responseText;
+        let end;
+        while ((end = text.indexOf('\n\n', parsed)) !== -1) {
+          const block = text.slice(parsed, end);
+          parsed = end + 2;
+          let type = 'message';
+          let data = '';
+          block.split('\n').forEach(line => {
+            if (line.startsWith('event: ')) type = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+          });
+          if (!data || cancelled) continue;
+          const payload = JSON.parse(data);
+          handleEvent(type, payload);
+          if (type === 'status' && (payload.status === 'done' || payload.status === 'failed')) finished = true;
+        }
+      };
+      xhr.onloadend = () => {
+        if (!cancelled && !finished) poll();
+      };
+      xhr.send();
+    };
+
+    const poll = () => {
+      fetch(`http://192.168.215.143:5000/diagnosis/${job_id}`)
+        .then(response => response.json())
+        .then(data => {
+          if (cancelled) return;
+          applyStatus(data);
+          if (data.status !== 'done' && data.status !== 'failed') {
+            timer = setTimeout(poll, 3000);
+          }
+        })
+        .catch(err => {
+          console.error("Error fetching diagnosis:", err);
+          if (!cancelled) timer = setTimeout(poll, 5000);
+        });
+    };
+    stream();
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+      if (xhr) xhr.abort();
+    };
+  }, [job_id]);
+
   useEffect(() => {
     if (!city) {
       AsyncStorage.getItem('userData')
         .then((userData) => {
           if (userData) {
             const { email } = JSON.parse(userData);
-            fetch(`http://192.168.215.143:5000/getDetails?email=${encodeURIComponent(email)}`)
+            conditionalFetch(`http://192.168.215.143:5000/getDetails?email=${encodeURIComponent(email)}`)
               .then(response => response.json())
               .then(data => {
                 if (data.details && data.details.contact && data.details.contact.city) {
@@ -93,6 +188,15 @@ const ResultScreen = () => {
 
             <Divider style={styles.divider} />
 
+            {image_id ? (
+              // The server keeps a small thumbnail of every upload; the full image is never needed here
+              <Image
+                source={{ uri: `http://192.168.215.143:5000/image/${image_id}/thumbnail` }}
+                style={styles.thumbnail}
+                resizeMode="cover"
+              />
+            ) : null}
+
             <View style={styles.resultContent}>
               {diagnosis ? (
                 <View style={styles.diagnosisContainer}>
@@ -101,6 +205,19 @@ const ResultScreen = () => {
                     {diagnosis}
                   </Text>
                 </View>
+              ) : jobStatus === 'queued' || jobStatus === 'running' ? (
+                <View style={styles.diagnosisContainer}>
+                  <Text style={styles.pendingText}>
+                    {jobStatus === 'queued'
+                      ? 'Waiting for the AI doctor...'
+                      : STAGE_LABELS[stage] || 'Analysing your image, this can take a few minutes...'}
+                  </Text>
+                  {partialDiagnosis ? (
+                    <Text style={[styles.diagnosisText, styles.partialText]}>
+                      {partialDiagnosis}
+                    </Text>
+                  ) : null}
+                </View>
               ) : (
                 <Text style={styles.errorText}>
                   No diagnosis information available. Please try again.
@@ -159,6 +276,13 @@ const styles = StyleSheet.create({
     borderRadius: 12,
     marginBottom: 20,
   },
+  thumbnail: {
+    width: 160,
+    height: 160,
+    borderRadius: 8,
+    alignSelf: 'center',
+    marginBottom: 16,
+  },
   headerSection: {
     alignItems: 'center',
     marginBottom: 16,
@@ -190,6 +314,14 @@ const styles = StyleSheet.create({
     fontSize: 15,
     lineHeight: 22,
   },
+  pendingText: {
+    textAlign: 'center',
+    marginVertical: 16,
+    opacity: 0.7,
+  },
+  partialText: {
+    opacity: 0.8,
+  },
   errorText: {
     color: 'red',
     textAlign: 'center',
@@ -0,0 +1,192 @@
+# slot_calendar.py
+#
+# Server-side appointment availability. Each doctor's day is a fixed grid of
+# slots (working hours split into slot_minutes), and the booked slots of a
+# (doctor, day) are kept as a bitmap: bit i set means slot i is taken. Days
+# are loaded from the appointment table on first use, in one query for the
+# whole doctors x dates request, then kept current from committed ORM
+# inserts/deletes in this process. Cached days expire after `ttl` seconds so
+# bookings made by other processes show up.
+
+import hashlib
+import threading
+import time as _time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, object_session
+
+SLOT_FORMAT = "%I:%M %p"
+
+
+class SlotCalendar:
+    """Per-doctor, per-day booked-slot bitmaps over a fixed working-hours grid."""
+
+    def __init__(self, loader, day_start, day_end, slot_minutes=60, ttl=60, max_days=50000):
+        # loader(db, doc_ids, start_date, end_date) -> iterable of (doc_id, date, time)
+        self.loader = loader
+        self.slot_minutes = slot_minutes
+        self.ttl = ttl
+        self.max_days = max_days
+        start = day_start.hour * 60 + day_start.minute
+        end = day_end.hour * 60 + day_end.minute
+        self._start_minute = start
+        self.slots = [
+            (datetime.min + timedelta(minutes=minute)).time()
+            for minute in range(start, end - slot_minutes + 1, slot_minutes)
+        ]
+        self.labels = [slot.strftime(SLOT_FORMAT) for slot in self.slots]
+        self._lock = threading.Lock()
+        # (doc_id, date) -> (bitmap, loaded_at), least recently used first
+        self._days = OrderedDict()
+        # Bumped on every applied change, so a load that raced a booking is not cached
+        self._generation = 0
+
+    # --- Slot arithmetic ---
+    def slot_index(self, slot_time):
+        """Index of `slot_time` on the grid, or None if it is not a slot start."""
+        offset = slot_time.hour * 60 + slot_time.minute - self._start_minute
+        if slot_time.second or offset < 0 or offset % self.slot_minutes:
+            return None
+        index = offset // self.slot_minutes
+        return index if index < len(self.slots) else None
+
+    def containing_slot(self, slot_time):
+        """Index of the slot whose interval contains `slot_time`, or None outside working hours.
+
+        Older appointments can sit off the grid (e.g. 10:30 on an hourly
+        grid); they still take the slot they fall in.
+        """
+        offset = slot_time.hour * 60 + slot_time.minute - self._start_minute
+        if offset < 0:
+            return None
+        index = offset // self.slot_minutes
+        return index if index < len(self.slots) else None
+
+    def _labels(self, bitmap, booked):
+        return [label for i, label in enumerate(self.labels) if bool(bitmap >> i & 1) == booked]
+
+    # --- Incremental updates ---
+    def _apply(self, doc_id, day, slot_time, booked):
+        index = self.containing_slot(slot_time)
+        with self._lock:
+            self._generation += 1
+            if not booked and self.slot_index(slot_time) is None:
+                # An off-grid appointment may share its slot with another one; reload the day
+                self._days.pop((doc_id, day), None)
+                return
+            cached = self._days.get((doc_id, day))
+            if cached is None or index is None:
+                return
+            bitmap, loaded_at = cached
+            bitmap = bitmap | (1 << index) if booked else bitmap & ~(1 << index)
+            self._days[(doc_id, day)] = (bitmap, loaded_at)
+
+    def book(self, doc_id, day, slot_time):
+        self._apply(doc_id, day, slot_time, True)
+
+    def release(self, doc_id, day, slot_time):
+        self._apply(doc_id, day, slot_time, False)
+
+    def forget(self, doc_id, day):
+        with self._lock:
+            self._generation += 1
+            self._days.pop((doc_id, day), None)
+
+    def track_changes(self, model):
+        """Apply committed inserts/updates/deletes of appointments (`model`) to the bitmaps."""
+        def remember(session, change):
+            if session is not None:
+                session.info.setdefault("slot_calendar_changes", []).append(change)
+
+        @event.listens_for(model, "after_insert")
+        def on_insert(mapper, connection, target):
+            remember(object_session(target), ("book", target.doc_id, target.date, target.time))
+
+        @event.listens_for(model, "after_update")
+        def on_update(mapper, connection, target):
+            # Moved appointments: drop both the old and the new day and reload them
+            state = sa_inspect(target)
+            old_doc = state.attrs.doc_id.history.deleted or [target.doc_id]
+            old_date = state.attrs.date.history.deleted or [target.date]
+            remember(object_session(target), ("forget", old_doc[0], old_date[0], None))
+            remember(object_session(target), ("forget", target.doc_id, target.date, None))
+
+        @event.listens_for(model, "after_delete")
+        def on_delete(mapper, connection, target):
+            remember(object_session(target), ("release", target.doc_id, target.date, target.time))
+
+        @event.listens_for(Session, "after_commit")
+        def on_commit(session):
+            for action, doc_id, day, slot_time in session.info.pop("slot_calendar_changes", []):
+                if action == "book":
+                    self.book(doc_id, day, slot_time)
+                elif action == "release":
+                    self.release(doc_id, day, slot_time)
+                else:
+                    self.forget(doc_id, day)
+
+        @event.listens_for(Session, "after_rollback")
+        def on_rollback(session):
+            session.info.pop("slot_calendar_changes", None)
+
+    # --- Lookups ---
+    def _bitmaps(self, db, doc_ids, days):
+        now = _time.monotonic()
+        bitmaps = {}
+        with self._lock:
+            for key in ((doc_id, day) for doc_id in doc_ids for day in days):
+                cached = self._days.get(key)
+                if cached is not None and now - cached[1] < self.ttl:
+                    self._days.move_to_end(key)
+                    bitmaps[key] = cached[0]
+            generation = self._generation
+        missing_docs = sorted({doc_id for doc_id in doc_ids for day in days if (doc_id, day) not in bitmaps})
+        if not missing_docs:
+            return bitmaps
+
+        loaded = {(doc_id, day): 0 for doc_id in missing_docs for day in days}
+        for doc_id, day, slot_time in self.loader(db, missing_docs, days[0], days[-1]):
+            index = self.containing_slot(slot_time)
+            if (doc_id, day) in loaded and index is not None:
+                loaded[(doc_id, day)] |= 1 << index
+        with self._lock:
+            # A change committed while we were reading may be missing from `loaded`
+            if generation == self._generation:
+                for key, bitmap in loaded.items():
+                    self._days[key] = (bitmap, now)
+                    self._days.move_to_end(key)
+                while len(self._days) > self.max_days:
+                    self._days.popitem(last=False)
+        for key, bitmap in loaded.items():
+            bitmaps.setdefault(key, bitmap)
+        return bitmaps
+
+    def bitmaps(self, db, doc_ids, start_date, end_date):
+        """Booked-slot bitmaps keyed by (doc_id, date) for every doctor and day in [start_date, end_date]."""
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        return self._bitmaps(db, doc_ids, days)
+
+    def tag(self, bitmaps):
+        """Version tag of `bitmaps`: changes when any slot in them is booked or freed.
+
+        Computed from the bitmaps (one int per doctor and day), not from the
+        rendered labels, and the same in every process for the same bookings.
+        """
+        state = (self._start_minute, self.slot_minutes, len(self.slots), sorted(bitmaps.items()))
+        return hashlib.blake2b(repr(state).encode(), digest_size=8).hexdigest()
+
+    def render(self, bitmaps, doc_ids):
+        """Free and booked slot labels per doctor and ISO day, from `bitmaps()`."""
+        result = {doc_id: {} for doc_id in doc_ids}
+        for (doc_id, day), bitmap in sorted(bitmaps.items()):
+            result[doc_id][day.isoformat()] = {
+                "free": self._labels(bitmap, booked=False),
+                "booked": self._labels(bitmap, booked=True),
+            }
+        return result
+
+    def availability(self, db, doc_ids, start_date, end_date):
+        """Free and booked slot labels for every doctor and day in [start_date, end_date]."""
+        return self.render(self.bitmaps(db, doc_ids, start_date, end_date), doc_ids)
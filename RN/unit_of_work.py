@@ -0,0 +1,21 @@
+# unit_of_work.py
+#
+# Write endpoints build up all of their rows inside one unit of work: keys
+# that later rows depend on are obtained with flush(), and the transaction is
+# committed exactly once at the end, or rolled back as a whole on any error.
+
+from contextlib import contextmanager
+
+
+@contextmanager
+def unit_of_work(db):
+    """Commit `db` once if the block succeeds, roll everything back otherwise.
+
+    Inside the block use db.add()/db.flush() only, never db.commit().
+    """
+    try:
+        yield db
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise